@@ -1,40 +1,354 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from dijkstra import GrafoDijkstra
+from dijkstra import GrafoDijkstra, ALGORITMOS, HORAS_DIA, PERFILES, UNIDADES_ALCANCE
+from contraccion import JerarquiaContraccion, RUTA_JERARQUIA
+from landmarks import Landmarks, RUTA_LANDMARKS
+from cache_rutas import CacheRutas
+from cache_respuestas import CacheRespuestas
+import instantanea
+import binario
+from recarga import RecargaGrafo
+from riesgo_horario import riesgo_aristas_por_hora, RUTA_INCIDENTES, RUTA_ZONAS
+from pareto import frente_pareto
+from lotes import resolver_lote, calcular_matriz, cerrar_pool, MAX_PARES_LOTE, MAX_PUNTOS_MATRIZ
 import json
+import math
+import os
 
 app = Flask(__name__)
 CORS(app)  # Permite que JavaScript se conecte
 
-# Cargar grafo al iniciar
-print("🔄 Cargando grafo...")
-grafo = GrafoDijkstra()
-grafo.cargar_desde_csv()
-print("✅ API lista\n")
+cache_rutas = CacheRutas()
+cache_respuestas = CacheRespuestas()
+MAX_ALTERNATIVAS = 5
+FORMATOS_RUTA = ('completo', 'compacto')
+MAX_VECINOS_SNAP = 50
+MAX_PUNTOS_SNAP = 1000
+
+FUENTES_GRAFO = instantanea.FUENTES + (instantanea.RUTA_INSTANTANEA, RUTA_JERARQUIA,
+                                        RUTA_LANDMARKS, RUTA_ZONAS, RUTA_INCIDENTES)
+
+def cargar_grafo():
+    """Grafo listo para atender; se usa al iniciar y en cada recarga (ver recarga.py).
+
+    La instantánea binaria (se genera con: python backend/instantanea.py)
+    se mapea en memoria sin leer los CSV.
+    """
+    print("🔄 Cargando grafo...")
+    grafo = None
+    if instantanea.vigente():
+        grafo = instantanea.cargar()
+    elif os.path.exists(instantanea.RUTA_INSTANTANEA):
+        print("ℹ️  La instantánea es más vieja que los CSV: se ignora")
+    if grafo is None:
+        grafo = GrafoDijkstra()
+        grafo.cargar_desde_csv()
+    
+    # Contraction Hierarchy (se genera con: python backend/contraccion.py)
+    if os.path.exists(RUTA_JERARQUIA):
+        grafo.jerarquia = JerarquiaContraccion.cargar(RUTA_JERARQUIA, grafo)
+    if grafo.jerarquia is None:
+        print("ℹ️  Sin Contraction Hierarchy: algoritmo 'ch' deshabilitado")
+    
+    # Landmarks para ALT (se generan con: python backend/landmarks.py)
+    if os.path.exists(RUTA_LANDMARKS):
+        grafo.landmarks = Landmarks.cargar(RUTA_LANDMARKS, grafo)
+    if grafo.landmarks is None:
+        print("ℹ️  Sin landmarks: algoritmo 'alt' deshabilitado")
+    
+    # Riesgo por hora del día a partir del historial de incidentes
+    if os.path.exists(RUTA_INCIDENTES):
+        grafo.establecer_riesgo_horario(riesgo_aristas_por_hora(grafo))
+    else:
+        print("ℹ️  Sin historial de incidentes: se ignora la hora de salida")
+    return grafo
+
+def precalentar(grafo):
+    """Arma ya lo que si no se arma en la primera petición que lo usa: la
+    geometría del mapa, los pesos de cada hora y las respuestas comprimidas.
+
+    Cargar el grafo no lo hace, así importar la API es casi instantáneo;
+    servidor.py lo llama en el maestro antes del fork para que los
+    trabajadores lo compartan en vez de armarlo cada uno.
+    """
+    grafo.geometria()
+    if grafo.riesgo_hora_semi is not None:
+        for hora in range(HORAS_DIA):
+            grafo.pesos_para(hora)
+    for nombre, (construir, _) in RECURSOS.items():
+        cache_respuestas.obtener(nombre, grafo.version, lambda: construir(grafo))
+
+def grafo_actual():
+    """Grafo vigente. Cada petición lo toma una sola vez: si mientras
+    atiende se publica otro, termina con el que empezó."""
+    return recarga.actual
+
+def al_publicar(grafo):
+    """Descarta lo cacheado con el grafo anterior"""
+    cache_rutas.limpiar()
+    cerrar_pool()
+    cache_respuestas.conservar(grafo.version)
+
+def datos_nodos(grafo):
+    return {
+        'success': True,
+        'nodos': grafo.exportar_nodos()
+    }
+
+def datos_aristas(grafo):
+    aristas = grafo.exportar_aristas()
+    return {
+        'success': True,
+        'aristas': aristas,
+        'total': len(aristas)
+    }
+
+# Respuestas completas que solo dependen del grafo: nombre -> (construir(grafo), mimetype)
+RECURSOS = {
+    'nodos': (datos_nodos, 'application/json'),
+    'aristas': (datos_aristas, 'application/json'),
+    'nodos.bin': (binario.nodos, binario.MIMETYPE),
+    'aristas.bin': (binario.aristas, binario.MIMETYPE),
+}
+
+def respuesta_cacheada(grafo, nombre):
+    """Cuerpo serializado y comprimido una vez por versión del grafo, con ETag.
+
+    Si el cliente manda el ETag vigente en If-None-Match se responde 304.
+    """
+    construir, mimetype = RECURSOS[nombre]
+    recurso = cache_respuestas.obtener(nombre, grafo.version, lambda: construir(grafo))
+    con_gzip = 'gzip' in request.accept_encodings
+    
+    respuesta = Response(recurso.cuerpo_gzip if con_gzip else recurso.cuerpo,
+                         mimetype=mimetype)
+    if con_gzip:
+        respuesta.headers['Content-Encoding'] = 'gzip'
+    # Cada codificación es una representación distinta: ETag distinto
+    respuesta.set_etag(recurso.etag + ('-gz' if con_gzip else ''))
+    respuesta.headers['Vary'] = 'Accept-Encoding'
+    respuesta.cache_control.no_cache = True
+    return respuesta.make_conditional(request)
+
+def leer_vista(args):
+    """(lat_min, lon_min, lat_max, lon_max), zoom de ?bbox=lat,lon,lat,lon&zoom="""
+    bbox = [float(valor) for valor in args['bbox'].split(',')]
+    if len(bbox) != 4 or not all(map(math.isfinite, bbox)):
+        raise ValueError('bbox')
+    zoom = args.get('zoom')
+    return bbox, (int(zoom) if zoom is not None else None)
+
+def leer_formato(args):
+    """True si se pidió ?formato=binario (ver binario.py); por defecto JSON"""
+    formato = args.get('formato', 'json')
+    if formato not in ('json', 'binario'):
+        raise ValueError(formato)
+    return formato == 'binario'
+
+def error_vista():
+    return jsonify({
+        'success': False,
+        'error': ('bbox debe ser lat_min,lon_min,lat_max,lon_max, zoom un entero '
+                  "y formato 'json' o 'binario'")
+    }), 400
 
 @app.route('/api/nodos', methods=['GET'])
 def obtener_nodos():
-    """Devuelve todos los nodos"""
+    """Devuelve todos los nodos, o con ?bbox=&zoom= los visibles (id, lat, lon, riesgo).
+
+    Con ?formato=binario se envían arreglos tipados (ver binario.py).
+    """
+    grafo = grafo_actual()
+    try:
+        en_binario = leer_formato(request.args)
+        if 'bbox' in request.args:
+            bbox, zoom = leer_vista(request.args)
+    except ValueError:
+        return error_vista()
+    
+    if 'bbox' not in request.args:
+        if en_binario:
+            return respuesta_cacheada(grafo, 'nodos.bin')
+        return respuesta_cacheada(grafo, 'nodos')
+    
+    zoom, indices = grafo.geometria().nodos_visibles(*bbox, zoom=zoom)
+    if en_binario:
+        return Response(binario.nodos_visibles(grafo, indices, zoom),
+                        mimetype=binario.MIMETYPE)
     return jsonify({
         'success': True,
-        'nodos': grafo.nodos
+        'zoom': zoom,
+        'nodos': [{'id': grafo.ids[i], 'lat': grafo.lat[i], 'lon': grafo.lon[i],
+                   'riesgo': grafo.riesgo[i]} for i in indices],
+        'total': len(indices)
     })
 
+def leer_coordenadas(lat, lon):
+    """(lat, lon) como float; ValueError si no son números finitos"""
+    punto = (float(lat), float(lon))
+    if not all(map(math.isfinite, punto)):
+        raise ValueError('coordenadas')
+    return punto
+
+def leer_punto(valor):
+    """Id de nodo, o tupla (lat, lon) si vienen coordenadas {'lat', 'lon'} / [lat, lon]"""
+    if isinstance(valor, dict):
+        lat, lon = valor['lat'], valor['lon']
+    elif isinstance(valor, (list, tuple)):
+        lat, lon = valor
+    elif isinstance(valor, float) and not math.isfinite(valor):
+        raise ValueError('id')
+    else:
+        return int(valor)
+    return leer_coordenadas(lat, lon)
+
+def leer_puntos(data):
+    """Lista de (lat, lon) de ``puntos`` o de los parámetros lat/lon"""
+    if 'puntos' not in data:
+        return [leer_coordenadas(data.get('lat'), data.get('lon'))]
+    puntos = [leer_punto(p) for p in data['puntos']]
+    if not all(isinstance(p, tuple) for p in puntos):
+        raise ValueError("Cada punto debe tener lat y lon")
+    return puntos
+
+def nodo_de(grafo, punto):
+    """Id de nodo; las coordenadas se ajustan al nodo más cercano"""
+    if isinstance(punto, tuple):
+        return grafo.nodos_cercanos(*punto)[0]['id']
+    return punto
+
+def presentar_ruta(grafo, resultado, formato, hora, perfil):
+    """'completo': el resultado tal cual; 'compacto': ids, polilínea y un tramo por calle"""
+    if formato == 'compacto':
+        return grafo.resumir_ruta(resultado, hora, perfil)
+    return resultado
+
 @app.route('/api/ruta', methods=['POST'])
 def calcular_ruta():
-    """Calcula ruta entre dos puntos"""
+    """Calcula ruta entre dos puntos (ids de nodo o coordenadas).
+
+    Con "formato": "compacto" la ruta trae la polilínea codificada y un
+    resumen por calle en vez de un nodo completo por paso.
+    """
+    grafo = grafo_actual()
     data = request.get_json()
-    origen = int(data.get('origen'))
-    destino = int(data.get('destino'))
+    try:
+        origen = leer_punto(data.get('origen'))
+        destino = leer_punto(data.get('destino'))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Origen y destino deben ser ids de nodo o coordenadas {lat, lon}'
+        }), 400
+    algoritmo = data.get('algoritmo', 'dijkstra')
+    hora = data.get('hora')
+    perfil = data.get('perfil')
+    formato = data.get('formato', 'completo')
+    
+    if formato not in FORMATOS_RUTA:
+        return jsonify({
+            'success': False,
+            'error': f"Formato no soportado: {formato}",
+            'formatos': list(FORMATOS_RUTA)
+        }), 400
+    
+    if perfil is not None and (not isinstance(perfil, str) or perfil not in PERFILES):
+        return jsonify({
+            'success': False,
+            'error': f"Perfil no soportado: {perfil}",
+            'perfiles': list(PERFILES)
+        }), 400
+    
+    if hora is not None:
+        try:
+            hora = int(hora)
+            grafo.pesos_para(hora, perfil)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': f"Hora inválida: {e}"
+            }), 400
+    
+    if algoritmo == 'ch' and grafo.pesos_para(hora, perfil) is not grafo.pesos:
+        return jsonify({
+            'success': False,
+            'error': "El algoritmo 'ch' solo usa los pesos base, sin hora ni perfil"
+        }), 400
+    
+    if algoritmo == 'alt' and not grafo.perfil_acotado(perfil):
+        return jsonify({
+            'success': False,
+            'error': f"El algoritmo 'alt' no admite el perfil '{perfil}'"
+        }), 400
+    
+    if not isinstance(algoritmo, str) or algoritmo not in ALGORITMOS:
+        return jsonify({
+            'success': False,
+            'error': f"Algoritmo no soportado: {algoritmo}",
+            'algoritmos': list(ALGORITMOS)
+        }), 400
+    
+    if algoritmo not in grafo.algoritmos_disponibles():
+        return jsonify({
+            'success': False,
+            'error': f"Faltan los datos precalculados para '{algoritmo}'"
+        }), 503
+    
+    try:
+        alternativas = int(data.get('alternativas', 1))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'alternativas debe ser un número entero'
+        }), 400
+    
+    # Con coordenadas, Dijkstra puede partir y llegar a mitad de cuadra;
+    # los demás motores trabajan sobre el nodo más cercano
+    if isinstance(origen, tuple) or isinstance(destino, tuple):
+        if algoritmo == 'dijkstra' and alternativas <= 1:
+            print(f"📍 Calculando ruta entre puntos: {origen} → {destino}")
+            resultado = grafo.calcular_ruta_entre(origen, destino, hora, perfil)
+            if not resultado:
+                return jsonify({
+                    'success': False,
+                    'error': 'No se encontró ruta'
+                }), 404
+            return jsonify({
+                'success': True,
+                'ruta': presentar_ruta(grafo, resultado, formato, hora, perfil)
+            })
+        origen, destino = nodo_de(grafo, origen), nodo_de(grafo, destino)
+    
+    if alternativas > 1:
+        print(f"🔀 Calculando {alternativas} rutas alternativas: {origen} → {destino}")
+        rutas = grafo.calcular_alternativas(origen, destino, min(alternativas, MAX_ALTERNATIVAS),
+                                            hora, perfil)
+        if not rutas:
+            return jsonify({
+                'success': False,
+                'error': 'No se encontró ruta'
+            }), 404
+        rutas = [presentar_ruta(grafo, ruta, formato, hora, perfil) for ruta in rutas]
+        return jsonify({
+            'success': True,
+            'ruta': rutas[0],
+            'alternativas': rutas
+        })
     
-    print(f"📍 Calculando ruta: {origen} → {destino}")
+    print(f"📍 Calculando ruta ({algoritmo}): {origen} → {destino}")
     
-    resultado = grafo.calcular_ruta(origen, destino)
+    clave = perfil or 'predeterminado'
+    if hora is not None:
+        clave = f"{clave}-hora-{hora}"
+    resultado = cache_rutas.ruta(
+        grafo, origen, destino, clave,
+        calcular=lambda: grafo.calcular_ruta(origen, destino, algoritmo, hora, perfil),
+        algoritmo=algoritmo)
     
     if resultado:
         return jsonify({
             'success': True,
-            'ruta': resultado
+            'ruta': presentar_ruta(grafo, resultado, formato, hora, perfil)
         })
     else:
         return jsonify({
@@ -42,48 +356,295 @@ def calcular_ruta():
             'error': 'No se encontró ruta'
         }), 404
 
+@app.route('/api/ruta/pareto', methods=['POST'])
+def calcular_ruta_pareto():
+    """Frente de rutas no dominadas en (km, riesgo acumulado)"""
+    grafo = grafo_actual()
+    data = request.get_json() or {}
+    
+    try:
+        origen = int(data.get('origen'))
+        destino = int(data.get('destino'))
+        hora = data.get('hora')
+        if hora is not None:
+            hora = int(hora)
+            grafo.pesos_para(hora)
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f"Parámetros inválidos: {e}"
+        }), 400
+    
+    print(f"📈 Calculando frente Pareto: {origen} → {destino}")
+    rutas, recortado = frente_pareto(grafo, origen, destino, hora)
+    
+    if not rutas:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró ruta'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'rutas': rutas,
+        'recortado': recortado
+    })
+
+def leer_pares(data):
+    """Normaliza [[o, d], ...] o [{'origen': o, 'destino': d}, ...]"""
+    pares = []
+    for par in data.get('pares') or []:
+        if isinstance(par, dict):
+            pares.append((int(par['origen']), int(par['destino'])))
+        else:
+            origen, destino = par
+            pares.append((int(origen), int(destino)))
+    return pares
+
+@app.route('/api/rutas/lote', methods=['POST'])
+def calcular_rutas_lote():
+    """Calcula muchas rutas; responde una línea JSON por par (NDJSON)"""
+    grafo = grafo_actual()
+    data = request.get_json() or {}
+    
+    try:
+        pares = leer_pares(data)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Formato de pares inválido'
+        }), 400
+    
+    if not pares or len(pares) > MAX_PARES_LOTE:
+        return jsonify({
+            'success': False,
+            'error': f"Se esperan entre 1 y {MAX_PARES_LOTE} pares"
+        }), 400
+    
+    paralelo = bool(data.get('paralelo', False))
+    print(f"📦 Lote de {len(pares)} rutas (paralelo={paralelo})")
+    
+    def generar():
+        for origen, destino, resultado in resolver_lote(grafo, pares, paralelo):
+            yield json.dumps({
+                'origen': origen,
+                'destino': destino,
+                'success': resultado is not None,
+                'ruta': resultado
+            }) + '\n'
+    
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+@app.route('/api/matriz', methods=['POST'])
+def matriz_costos():
+    """Matriz de costo ponderado, km y riesgo entre varios puntos"""
+    grafo = grafo_actual()
+    data = request.get_json() or {}
+    
+    try:
+        puntos = [int(p) for p in data.get('puntos') or []]
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Los puntos deben ser ids de nodo'
+        }), 400
+    
+    if len(puntos) < 2 or len(puntos) > MAX_PUNTOS_MATRIZ:
+        return jsonify({
+            'success': False,
+            'error': f"Se esperan entre 2 y {MAX_PUNTOS_MATRIZ} puntos"
+        }), 400
+    
+    print(f"🧮 Matriz de {len(puntos)}x{len(puntos)}")
+    matriz = calcular_matriz(grafo, puntos, bool(data.get('paralelo', True)))
+    
+    return jsonify({
+        'success': True,
+        'puntos': puntos,
+        **matriz
+    })
+
+@app.route('/api/alcance', methods=['GET', 'POST'])
+def calcular_alcance():
+    """Nodos y aristas alcanzables desde un origen con un presupuesto"""
+    grafo = grafo_actual()
+    data = request.get_json(silent=True) or request.args
+    
+    try:
+        origen = int(data.get('origen'))
+        presupuesto = float(data.get('presupuesto'))
+        if not math.isfinite(presupuesto):
+            raise ValueError('presupuesto')
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Se requieren origen y presupuesto numéricos'
+        }), 400
+    
+    unidad = data.get('unidad', 'costo')
+    if unidad not in UNIDADES_ALCANCE or presupuesto < 0:
+        return jsonify({
+            'success': False,
+            'error': f"Unidad debe ser una de {list(UNIDADES_ALCANCE)} y el presupuesto >= 0"
+        }), 400
+    
+    perfil = data.get('perfil')
+    if perfil is not None and (not isinstance(perfil, str) or perfil not in PERFILES):
+        return jsonify({
+            'success': False,
+            'error': f"Perfil no soportado: {perfil}",
+            'perfiles': list(PERFILES)
+        }), 400
+    
+    resultado = grafo.alcance(origen, presupuesto, unidad, perfil)
+    if resultado is None:
+        return jsonify({
+            'success': False,
+            'error': 'Origen inexistente'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'alcance': resultado
+    })
+
+@app.route('/api/snap', methods=['GET', 'POST'])
+def snap():
+    """Nodos más cercanos a un punto (GET lat, lon) o a varios (POST puntos)"""
+    grafo = grafo_actual()
+    data = request.get_json(silent=True) or request.args
+    
+    try:
+        k = min(int(data.get('k', 1)), MAX_VECINOS_SNAP)
+        puntos = leer_puntos(data)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Se requieren lat y lon numéricos (o una lista de puntos)'
+        }), 400
+    
+    if k < 1 or len(puntos) > MAX_PUNTOS_SNAP:
+        return jsonify({
+            'success': False,
+            'error': f"k debe ser >= 1 y se admiten hasta {MAX_PUNTOS_SNAP} puntos"
+        }), 400
+    
+    cercanos = [grafo.nodos_cercanos(lat, lon, k) for lat, lon in puntos]
+    if 'puntos' in data:
+        return jsonify({
+            'success': True,
+            'resultados': cercanos
+        })
+    return jsonify({
+        'success': True,
+        'nodos': cercanos[0]
+    })
+
+@app.route('/api/calle', methods=['GET', 'POST'])
+def calle_cercana():
+    """Calle más cercana a un punto (GET lat, lon) o a varios (POST puntos)"""
+    grafo = grafo_actual()
+    data = request.get_json(silent=True) or request.args
+    
+    try:
+        puntos = leer_puntos(data)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Se requieren lat y lon numéricos (o una lista de puntos)'
+        }), 400
+    
+    if len(puntos) > MAX_PUNTOS_SNAP:
+        return jsonify({
+            'success': False,
+            'error': f"Se admiten hasta {MAX_PUNTOS_SNAP} puntos"
+        }), 400
+    
+    calles = [grafo.punto_sobre_calle(lat, lon) for lat, lon in puntos]
+    if 'puntos' in data:
+        return jsonify({
+            'success': True,
+            'resultados': calles
+        })
+    return jsonify({
+        'success': True,
+        'calle': calles[0]
+    })
+
+@app.route('/api/componentes', methods=['GET'])
+def componentes():
+    """Tamaño de las componentes conexas del grafo (para limpiar los datos)"""
+    grafo = grafo_actual()
+    try:
+        limite = int(request.args.get('limite', 20))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limite debe ser un entero'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'componentes': grafo.reporte_componentes(limite)
+    })
+
 @app.route('/api/test', methods=['GET'])
 def test():
     """Endpoint de prueba"""
+    grafo = grafo_actual()
     return jsonify({
         'success': True,
         'message': 'API funcionando correctamente',
-        'total_nodos': len(grafo.nodos)
+        'total_nodos': len(grafo.nodos),
+        'version': grafo.version,
+        'recargas': recarga.recargas
+    })
+
+@app.route('/api/cache', methods=['GET'])
+def estadisticas_cache():
+    """Aciertos/fallos del caché de rutas"""
+    return jsonify({
+        'success': True,
+        'cache': cache_rutas.estadisticas()
     })
 
 @app.route('/api/aristas', methods=['GET'])
 def obtener_aristas():
-    """Devuelve todas las aristas para dibujar en canvas"""
-    import csv
-    
-    aristas = []
-    
-    with open('data/aristas_juliaca.csv', 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            origen_id = int(row['origen'])
-            destino_id = int(row['destino'])
-            
-            if origen_id in grafo.nodos and destino_id in grafo.nodos:
-                aristas.append({
-                    'origen': {
-                        'id': origen_id,
-                        'lat': grafo.nodos[origen_id]['lat'],
-                        'lon': grafo.nodos[origen_id]['lon']
-                    },
-                    'destino': {
-                        'id': destino_id,
-                        'lat': grafo.nodos[destino_id]['lat'],
-                        'lon': grafo.nodos[destino_id]['lon']
-                    },
-                    'riesgo': int(row['riesgo'])
-                })
+    """Devuelve todas las aristas para dibujar en canvas.
+
+    Con ?bbox=lat_min,lon_min,lat_max,lon_max solo los tramos de calle
+    visibles, simplificados para el zoom (0 = toda la ciudad; sin zoom se
+    deduce del bbox). Con ?formato=binario se envían arreglos tipados
+    (ver binario.py).
+    """
+    grafo = grafo_actual()
+    try:
+        en_binario = leer_formato(request.args)
+        if 'bbox' in request.args:
+            bbox, zoom = leer_vista(request.args)
+    except ValueError:
+        return error_vista()
     
+    if 'bbox' not in request.args:
+        if en_binario:
+            return respuesta_cacheada(grafo, 'aristas.bin')
+        return respuesta_cacheada(grafo, 'aristas')
+    
+    if en_binario:
+        zoom, visibles = grafo.geometria().tramos_visibles(*bbox, zoom=zoom)
+        return Response(binario.tramos(grafo, visibles, zoom), mimetype=binario.MIMETYPE)
+    zoom, tramos = grafo.geometria().tramos(*bbox, zoom=zoom)
     return jsonify({
         'success': True,
-        'aristas': aristas,
-        'total': len(aristas)
+        'zoom': zoom,
+        'tramos': tramos,
+        'total': len(tramos)
     })
+
+# Si cambian los datos se arma otro grafo y se publica sin reiniciar
+recarga = RecargaGrafo(cargar_grafo, FUENTES_GRAFO, al_publicar)
+print("✅ API lista\n")
+
 if __name__ == '__main__':
     print("="*50)
     print("🚀 API HEATMAP JULIACA")
@@ -92,4 +653,9 @@ if __name__ == '__main__':
     print("🔗 Prueba: http://localhost:5000/api/test")
     print("="*50 + "\n")
     
+    # Con debug=True el proceso que vigila el código no atiende: los datos
+    # los vigila solo el proceso hijo que corre la app
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        recarga.vigilar()
+    
     app.run(debug=True, port=5000)
\ No newline at end of file
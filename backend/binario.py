@@ -0,0 +1,108 @@
+"""
+FORMATO BINARIO DE GEOMETRÍA - JULIACA
+Alternativa a JSON para /api/nodos y /api/aristas (?formato=binario): en
+vez de un objeto por nodo o arista se envían arreglos tipados que el
+navegador lee directo con Float32Array/Uint32Array/Uint8Array, sin parsear.
+
+Todas las respuestas empiezan con el mismo encabezado de 32 bytes
+(little-endian):
+
+    magia (4 bytes), formato (uint16), zoom (uint16),
+    cantidad (uint32), puntos (uint32), lat0 (float64), lon0 (float64)
+
+Las coordenadas van en float32 como diferencia con (lat0, lon0): así
+conservan ~1 cm de precisión (en absoluto float32 pierde casi 1 m). Las
+secciones siguen en el orden de cada tipo, todas alineadas a 4 bytes y
+con los uint8 al final:
+
+    b'NODO'  cantidad = n:  ids uint32[n], coords float32[2n], riesgo uint8[n]
+    b'ARIS'  cantidad = m, puntos = n:  coords float32[2n] (por índice de
+             nodo), extremos uint32[2m] (índices en coords), riesgo uint8[m]
+    b'TRAM'  cantidad = tramos, puntos = total de puntos:
+             offsets uint32[tramos + 1], coords float32[2 * puntos], riesgo uint8[tramos]
+    b'VIST'  cantidad = puntos = nodos visibles:  igual que b'NODO'
+
+Los ids viajan en uint32: procesar_wkt.py numera los nodos desde 0.
+"""
+
+import struct
+from array import array
+
+MIMETYPE = 'application/octet-stream'
+FORMATO = 1
+ENCABEZADO = struct.Struct('<4sHHIIdd')
+
+
+def _encabezado(magia, cantidad, puntos=0, origen=(0.0, 0.0), zoom=0):
+    return ENCABEZADO.pack(magia, FORMATO, zoom, cantidad, puntos, *origen)
+
+
+def _coordenadas(lat, lon, origen):
+    """float32 intercalados (lat, lon) relativos a ``origen``"""
+    lat0, lon0 = origen
+    coords = array('f', [0.0]) * (2 * len(lat))
+    for i in range(len(lat)):
+        coords[2 * i] = lat[i] - lat0
+        coords[2 * i + 1] = lon[i] - lon0
+    return coords
+
+
+def _origen(grafo):
+    if not grafo.n:
+        return (0.0, 0.0)
+    return (min(grafo.lat), min(grafo.lon))
+
+
+def nodos(grafo):
+    """Todos los nodos: id, coordenadas y riesgo (sin nombres)"""
+    origen = _origen(grafo)
+    return b''.join((
+        _encabezado(b'NODO', grafo.n, grafo.n, origen),
+        array('I', grafo.ids).tobytes(),
+        _coordenadas(grafo.lat, grafo.lon, origen).tobytes(),
+        array('B', grafo.riesgo).tobytes(),
+    ))
+
+
+def aristas(grafo):
+    """Todas las aristas como pares de índices sobre la tabla de coordenadas"""
+    origen = _origen(grafo)
+    extremos = array('I', [0]) * (2 * grafo.m)
+    extremos[0::2] = array('I', grafo.arista_u)
+    extremos[1::2] = array('I', grafo.arista_v)
+    return b''.join((
+        _encabezado(b'ARIS', grafo.m, grafo.n, origen),
+        _coordenadas(grafo.lat, grafo.lon, origen).tobytes(),
+        extremos.tobytes(),
+        array('B', grafo.arista_riesgo).tobytes(),
+    ))
+
+
+def tramos(grafo, visibles, zoom):
+    """Tramos de GeometriaMapa.tramos_visibles: polilíneas concatenadas con sus offsets"""
+    origen = _origen(grafo)
+    offsets = array('I', [0])
+    puntos = []
+    for _, nodos in visibles:
+        puntos.extend(nodos)
+        offsets.append(len(puntos))
+    lat = [grafo.lat[v] for v in puntos]
+    lon = [grafo.lon[v] for v in puntos]
+    return b''.join((
+        _encabezado(b'TRAM', len(visibles), len(puntos), origen, zoom),
+        offsets.tobytes(),
+        _coordenadas(lat, lon, origen).tobytes(),
+        array('B', (riesgo for riesgo, _ in visibles)).tobytes(),
+    ))
+
+
+def nodos_visibles(grafo, indices, zoom):
+    """Nodos de GeometriaMapa.nodos_visibles con id, coordenadas y riesgo"""
+    origen = _origen(grafo)
+    return b''.join((
+        _encabezado(b'VIST', len(indices), len(indices), origen, zoom),
+        array('I', (grafo.ids[i] for i in indices)).tobytes(),
+        _coordenadas([grafo.lat[i] for i in indices], [grafo.lon[i] for i in indices],
+                     origen).tobytes(),
+        array('B', (grafo.riesgo[i] for i in indices)).tobytes(),
+    ))
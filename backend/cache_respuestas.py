@@ -0,0 +1,66 @@
+"""
+CACHÉ DE RESPUESTAS - JULIACA
+Las respuestas grandes que solo dependen de los datos del grafo
+(/api/nodos, /api/aristas, en JSON o binario) se serializan una vez por versión del grafo y
+se guardan ya comprimidas con gzip junto con su ETag. Una recarga de la
+página con el ETag vigente se responde con 304 sin tocar el grafo.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+
+# Versiones del grafo con recursos guardados: la publicada y la que se está
+# armando (o la anterior, mientras terminan las peticiones que la usan)
+VERSIONES_GUARDADAS = 2
+
+
+class Recurso:
+    """Cuerpo JSON serializado, su versión gzip y el ETag del contenido"""
+
+    def __init__(self, cuerpo):
+        self.cuerpo = cuerpo
+        self.cuerpo_gzip = gzip.compress(cuerpo, compresslevel=9)
+        # El ETag sale del contenido: todos los procesos calculan el mismo
+        self.etag = hashlib.sha1(cuerpo).hexdigest()[:20]
+
+
+class CacheRespuestas:
+    """Recursos serializados por (nombre, versión del grafo)"""
+
+    def __init__(self):
+        self._recursos = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, nombre, version, construir):
+        """Recurso ``nombre`` para ``version``; ``construir()`` arma la primera vez
+        el dict a serializar (o directamente los bytes del cuerpo)"""
+        clave = (nombre, version)
+        recurso = self._recursos.get(clave)
+        if recurso is None:
+            with self._lock:
+                recurso = self._recursos.get(clave)
+                if recurso is None:
+                    cuerpo = construir()
+                    if not isinstance(cuerpo, bytes):
+                        cuerpo = json.dumps(cuerpo, ensure_ascii=False,
+                                            separators=(',', ':')).encode('utf-8')
+                    recurso = Recurso(cuerpo)
+                    recursos = dict(self._recursos)
+                    recursos[clave] = recurso
+                    # Las versiones más viejas ya no se van a pedir
+                    versiones = list(dict.fromkeys(v for _, v in recursos))
+                    for vieja in versiones[:-VERSIONES_GUARDADAS]:
+                        recursos = {c: r for c, r in recursos.items() if c[1] != vieja}
+                    self._recursos = recursos
+        return recurso
+
+    def conservar(self, version):
+        """Descarta los recursos de todas las versiones salvo ``version``"""
+        with self._lock:
+            self._recursos = {c: r for c, r in self._recursos.items() if c[1] == version}
+
+    def limpiar(self):
+        with self._lock:
+            self._recursos = {}
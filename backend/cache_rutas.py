@@ -0,0 +1,94 @@
+"""
+CACHÉ DE RUTAS - JULIACA
+LRU acotado delante de GrafoDijkstra.calcular_ruta. La clave incluye la
+versión del grafo, así que recargar el grafo o los riesgos invalida todo.
+"""
+
+import threading
+from collections import OrderedDict
+
+CAPACIDAD_CACHE = 2048
+
+# Marca para cachear también los pares sin ruta
+_SIN_RUTA = object()
+
+
+class CacheRutas:
+    """Caché LRU de resultados de ruta con contadores de aciertos"""
+
+    def __init__(self, capacidad=CAPACIDAD_CACHE):
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def ruta(self, grafo, origen, destino, perfil='predeterminado', calcular=None,
+             algoritmo='dijkstra'):
+        """Devuelve la ruta cacheada o la calcula con ``calcular()``.
+
+        Sin ``calcular`` se usa ``grafo.calcular_ruta(origen, destino)``.
+        Cada motor tiene sus propias entradas: el resultado informa el
+        algoritmo y los nodos explorados.
+        """
+        clave = (origen, destino, algoritmo, perfil, grafo.version)
+
+        with self._lock:
+            if grafo.version != self._version:
+                self._invalidar(grafo.version)
+            resultado = self._entradas.get(clave)
+            if resultado is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._marcar(resultado)
+            self.fallos += 1
+
+        # Se calcula fuera del lock para no serializar las búsquedas
+        if calcular is None:
+            resultado = grafo.calcular_ruta(origen, destino)
+        else:
+            resultado = calcular()
+
+        with self._lock:
+            if clave[-1] == self._version:
+                self._entradas[clave] = _SIN_RUTA if resultado is None else resultado
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.capacidad:
+                    self._entradas.popitem(last=False)
+                    self.desalojos += 1
+
+        return resultado
+
+    def _marcar(self, resultado):
+        """Copia superficial del resultado indicando que salió del caché"""
+        if resultado is _SIN_RUTA:
+            return None
+        return {**resultado, 'desde_cache': True}
+
+    def _invalidar(self, version):
+        self._entradas.clear()
+        self._version = version
+        self.invalidaciones += 1
+
+    def limpiar(self):
+        """Vacía el caché (los contadores se conservan)"""
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """Contadores para dimensionar el caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'capacidad': self.capacidad,
+                'entradas': len(self._entradas),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'desalojos': self.desalojos,
+                'invalidaciones': self.invalidaciones,
+                'version_grafo': self._version
+            }
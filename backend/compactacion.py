@@ -0,0 +1,179 @@
+"""
+COMPACTACIÓN DE CADENAS - JULIACA
+procesar_wkt.py crea un nodo por cada punto de forma de las vías de OSM:
+la mayoría solo tiene dos vecinos y no es una intersección. Aquí se unen
+esas cadenas de nodos de paso en una sola arista por cadena, guardando
+los nodos intermedios para poder expandir la ruta y dibujar la geometría
+completa.
+"""
+
+from array import array
+
+INFINITO = float('inf')
+
+
+class GrafoCompacto:
+    """Grafo de intersecciones sobre los índices internos de GrafoDijkstra.
+
+    Los nodos de paso (grado 2, dos vecinos distintos) quedan sin arcos
+    propios: ``offsets``/``destinos`` solo tienen arcos entre nodos
+    núcleo y cada arco apunta con ``cadenas`` a la cadena que recorre
+    (``sentidos`` es 1 si va de su primer a su último nodo, 0 al revés).
+    La cadena ``k`` son los nodos ``cadena_nodos[cadena_offsets[k]:cadena_offsets[k+1]]``
+    (extremos incluidos) y las semiaristas originales entre ellos en
+    ``cadena_pos`` (una menos por cadena, en ``cadena_offsets[k] - k``).
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.offsets = array('l', [0])
+        self.destinos = array('l')
+        self.cadenas = array('l')
+        self.sentidos = array('B')
+        self.cadena_offsets = array('l', [0])
+        self.cadena_nodos = array('l')
+        self.cadena_pos = array('l')
+        # Nodo de paso -> (cadena, posición en la cadena); -1 en los núcleos
+        self.cadena_de = array('l', [-1]) * n
+        self.posicion = array('l', [0]) * n
+        self._pesos = {}  # id(pesos de GrafoDijkstra) -> (pesos, costos por cadena, pesos por arco)
+
+    @classmethod
+    def construir(cls, grafo):
+        """Recorre las cadenas desde cada nodo núcleo de ``grafo``"""
+        n, offsets, destinos, adj_arista = grafo.n, grafo.offsets, grafo.destinos, grafo.adj_arista
+        compacto = cls(n)
+
+        de_paso = array('B', [0]) * n
+        for v in range(n):
+            if offsets[v + 1] - offsets[v] == 2:
+                a, b = destinos[offsets[v]], destinos[offsets[v] + 1]
+                de_paso[v] = a != b and a != v and b != v
+
+        arcos = [[] for _ in range(n)]  # núcleo -> [(núcleo, cadena, sentido)]
+
+        def recorrer(u, pos):
+            """Sigue la semiarista ``pos`` desde ``u`` hasta el próximo núcleo"""
+            k = len(compacto.cadena_offsets) - 1
+            compacto.cadena_nodos.append(u)
+            v = destinos[pos]
+            while True:
+                compacto.cadena_pos.append(pos)
+                if not de_paso[v]:
+                    break
+                compacto.cadena_de[v] = k
+                compacto.posicion[v] = len(compacto.cadena_nodos) - compacto.cadena_offsets[k]
+                compacto.cadena_nodos.append(v)
+                # La otra semiarista del nodo de paso (no la de regreso)
+                pos = offsets[v] if adj_arista[offsets[v]] != adj_arista[pos] else offsets[v] + 1
+                v = destinos[pos]
+            compacto.cadena_nodos.append(v)
+            compacto.cadena_offsets.append(len(compacto.cadena_nodos))
+            arcos[u].append((v, k, 1))
+            if v != u:
+                arcos[v].append((u, k, 0))
+
+        for u in range(n):
+            if de_paso[u]:
+                continue
+            for pos in range(offsets[u], offsets[u + 1]):
+                v = destinos[pos]
+                # Cada cadena se recorre una sola vez: si tiene nodos de paso,
+                # desde el primer extremo que la encuentra; si es una arista
+                # directa, desde su semiarista principal
+                if de_paso[v]:
+                    if compacto.cadena_de[v] == -1:
+                        recorrer(u, pos)
+                elif pos == grafo._posicion_arista(adj_arista[pos]):
+                    recorrer(u, pos)
+
+        # Ciclos formados solo por nodos de paso: uno pasa a ser núcleo
+        for u in range(n):
+            if de_paso[u] and compacto.cadena_de[u] == -1:
+                de_paso[u] = 0
+                recorrer(u, offsets[u])
+
+        for u in range(n):
+            for v, k, sentido in arcos[u]:
+                compacto.destinos.append(v)
+                compacto.cadenas.append(k)
+                compacto.sentidos.append(sentido)
+            compacto.offsets.append(len(compacto.destinos))
+
+        nucleos = sum(1 for u in range(n) if compacto.cadena_de[u] == -1)
+        print(f"✅ Grafo compactado: {nucleos} nodos núcleo de {n}, "
+              f"{len(compacto.cadena_offsets) - 1} cadenas")
+        return compacto
+
+    def nodos_cadena(self, k):
+        """Nodos de la cadena ``k`` de un extremo al otro"""
+        return self.cadena_nodos[self.cadena_offsets[k]:self.cadena_offsets[k + 1]]
+
+    def posiciones_cadena(self, k):
+        """Semiaristas originales de la cadena ``k`` en el sentido de sus nodos"""
+        return self.cadena_pos[self.cadena_offsets[k] - k:self.cadena_offsets[k + 1] - k - 1]
+
+    def pesos_para(self, pesos):
+        """(costo de cada cadena, peso de cada arco) con los ``pesos`` originales"""
+        guardado = self._pesos.get(id(pesos))
+        if guardado is not None and guardado[0] is pesos:
+            return guardado[1], guardado[2]
+
+        costos = array('d', (sum(pesos[pos] for pos in self.posiciones_cadena(k))
+                             for k in range(len(self.cadena_offsets) - 1)))
+        pesos_arcos = array('d', map(costos.__getitem__, self.cadenas))
+        self._pesos[id(pesos)] = (pesos, costos, pesos_arcos)
+        return costos, pesos_arcos
+
+    def avance(self, v, pesos):
+        """Costo desde el primer nodo de la cadena de ``v`` hasta ``v``"""
+        k, j = self.cadena_de[v], self.posicion[v]
+        return sum(pesos[pos] for pos in self.posiciones_cadena(k)[:j])
+
+    def extremos(self, v, pesos):
+        """Pares (núcleo, costo desde ``v``) por los que sale la búsqueda"""
+        k = self.cadena_de[v]
+        if k == -1:
+            return [(v, 0.0)]
+        costos, _ = self.pesos_para(pesos)
+        avance = self.avance(v, pesos)
+        nodos = self.nodos_cadena(k)
+        return [(nodos[0], avance), (nodos[-1], costos[k] - avance)]
+
+    def tramo(self, v, nucleo, pesos):
+        """Nodos de la cadena de ``v`` desde ``v`` hasta su extremo ``nucleo``"""
+        k, j = self.cadena_de[v], self.posicion[v]
+        if k == -1:
+            return [v]
+        nodos = self.nodos_cadena(k)
+        if nodos[0] != nucleo:
+            return list(nodos[j:])
+        if nodos[-1] != nucleo:
+            return list(reversed(nodos[:j + 1]))
+        # Cadena cerrada sobre un mismo núcleo: sale por el lado más barato
+        costos, _ = self.pesos_para(pesos)
+        avance = self.avance(v, pesos)
+        return list(reversed(nodos[:j + 1])) if avance <= costos[k] - avance else list(nodos[j:])
+
+    def entre(self, s, t, pesos):
+        """(costo, nodos) yendo directo de ``s`` a ``t`` por la misma cadena, o None"""
+        k = self.cadena_de[s]
+        if k == -1 or k != self.cadena_de[t]:
+            return None
+        i, j = self.posicion[s], self.posicion[t]
+        nodos = self.nodos_cadena(k)
+        camino = list(nodos[i:j + 1]) if i <= j else list(reversed(nodos[j:i + 1]))
+        return abs(self.avance(s, pesos) - self.avance(t, pesos)), camino
+
+    def expandir(self, nucleos, pesos_arcos):
+        """Nodos originales del camino entre núcleos consecutivos de ``nucleos``"""
+        camino = [nucleos[0]]
+        for a, b in zip(nucleos, nucleos[1:]):
+            # Entre dos núcleos puede haber varias cadenas: la más barata
+            mejor, peso_mejor = -1, INFINITO
+            for arco in range(self.offsets[a], self.offsets[a + 1]):
+                if self.destinos[arco] == b and pesos_arcos[arco] < peso_mejor:
+                    mejor, peso_mejor = arco, pesos_arcos[arco]
+            nodos = self.nodos_cadena(self.cadenas[mejor])
+            camino.extend(nodos[1:] if self.sentidos[mejor] else reversed(nodos[:-1]))
+        return camino
@@ -0,0 +1,313 @@
+"""
+CONTRACTION HIERARCHIES - JULIACA
+Preprocesa el grafo de aristas_juliaca.csv: contrae los nodos en orden de
+importancia agregando atajos y guarda la jerarquía en disco. Las consultas
+hacen una búsqueda bidireccional solo "hacia arriba" en esa jerarquía.
+"""
+
+import heapq
+import struct
+import time
+from array import array
+
+from dijkstra import GrafoDijkstra, INFINITO
+
+RUTA_JERARQUIA = 'data/ch_juliaca.bin'
+MAGIA = b'CHJ1'
+ENCABEZADO = struct.Struct('<4sIII')  # magia, huella, n, arcos
+
+# Límite de nodos asentados en cada búsqueda de testigos
+LIMITE_TESTIGOS = 60
+
+
+class JerarquiaContraccion:
+    """Grafo ascendente de una Contraction Hierarchy.
+
+    Para cada nodo ``u`` los arcos ``offsets[u]:offsets[u+1]`` van a
+    vecinos de mayor rango; ``medio`` es el nodo contraído que reemplaza
+    un atajo (-1 si el arco es una calle original).
+    """
+
+    def __init__(self, rango, offsets, destinos, pesos, medios, huella=0):
+        self.rango = rango
+        self.offsets = offsets
+        self.destinos = destinos
+        self.pesos = pesos
+        self.medios = medios
+        self.huella = huella
+
+    # ------------------------------------------------------------
+    # Preprocesamiento
+    # ------------------------------------------------------------
+
+    @classmethod
+    def construir(cls, grafo):
+        """Contrae todos los nodos de ``grafo`` y devuelve la jerarquía"""
+        n = grafo.n
+        # Adyacencia mutable: adyacencia[u][v] = (peso, medio)
+        adyacencia = [dict() for _ in range(n)]
+        for pos in range(len(grafo.destinos)):
+            e = grafo.adj_arista[pos]
+            u, v = grafo.arista_u[e], grafo.arista_v[e]
+            if u == v:
+                continue
+            peso = grafo.pesos[pos]
+            actual = adyacencia[u].get(v)
+            if actual is None or peso < actual[0]:
+                adyacencia[u][v] = (peso, -1)
+                adyacencia[v][u] = (peso, -1)
+
+        vecinos_contraidos = array('l', [0]) * n
+        cola = [(cls._prioridad(adyacencia, vecinos_contraidos, v), v) for v in range(n)]
+        heapq.heapify(cola)
+
+        rango = array('l', [0]) * n
+        arcos = [None] * n
+        siguiente_rango = 0
+        atajos = 0
+        inicio = time.time()
+
+        while cola:
+            prioridad, v = heapq.heappop(cola)
+
+            # Actualización perezosa: si la prioridad empeoró, se reencola
+            nueva = cls._prioridad(adyacencia, vecinos_contraidos, v)
+            if cola and nueva > cola[0][0]:
+                heapq.heappush(cola, (nueva, v))
+                continue
+
+            for u, w, peso in cls._atajos_necesarios(adyacencia, v):
+                actual = adyacencia[u].get(w)
+                if actual is None or peso < actual[0]:
+                    adyacencia[u][w] = (peso, v)
+                    adyacencia[w][u] = (peso, v)
+                    atajos += 1
+
+            # Los vecinos que quedan tendrán rango mayor: son arcos ascendentes
+            arcos[v] = list(adyacencia[v].items())
+            for u in adyacencia[v]:
+                del adyacencia[u][v]
+                vecinos_contraidos[u] += 1
+            adyacencia[v] = None
+
+            rango[v] = siguiente_rango
+            siguiente_rango += 1
+
+            if siguiente_rango % 5000 == 0:
+                print(f"   {siguiente_rango}/{n} nodos contraídos ({time.time() - inicio:.1f}s)")
+
+        print(f"✅ Contracción completa: {atajos} atajos en {time.time() - inicio:.1f}s")
+
+        offsets = array('l', [0])
+        destinos = array('l')
+        pesos = array('d')
+        medios = array('l')
+        for v in range(n):
+            for w, (peso, medio) in arcos[v]:
+                destinos.append(w)
+                pesos.append(peso)
+                medios.append(medio)
+            offsets.append(len(destinos))
+
+        return cls(rango, offsets, destinos, pesos, medios, grafo.huella())
+
+    @staticmethod
+    def _atajos_necesarios(adyacencia, v):
+        """Atajos (u, w, peso) que hacen falta al contraer ``v``"""
+        vecinos = list(adyacencia[v].items())
+        atajos = []
+
+        for i, (u, (peso_u, _)) in enumerate(vecinos):
+            objetivos = {w: peso_u + peso_w for w, (peso_w, _) in vecinos[i + 1:]}
+            if not objetivos:
+                continue
+
+            testigos = JerarquiaContraccion._buscar_testigos(
+                adyacencia, u, v, objetivos, max(objetivos.values()))
+
+            for w, peso in objetivos.items():
+                if testigos.get(w, INFINITO) > peso:
+                    atajos.append((u, w, peso))
+
+        return atajos
+
+    @staticmethod
+    def _buscar_testigos(adyacencia, u, excluido, objetivos, limite):
+        """Dijkstra local desde ``u`` sin pasar por ``excluido``"""
+        distancias = {u: 0.0}
+        cola = [(0.0, u)]
+        pendientes = len(objetivos)
+        asentados = 0
+
+        while cola and pendientes and asentados < LIMITE_TESTIGOS:
+            dist_actual, nodo = heapq.heappop(cola)
+            if dist_actual > distancias[nodo]:
+                continue
+            if dist_actual > limite:
+                break
+
+            asentados += 1
+            if nodo in objetivos:
+                pendientes -= 1
+
+            for vecino, (peso, _) in adyacencia[nodo].items():
+                if vecino == excluido:
+                    continue
+                distancia = dist_actual + peso
+                if distancia < distancias.get(vecino, INFINITO):
+                    distancias[vecino] = distancia
+                    heapq.heappush(cola, (distancia, vecino))
+
+        return distancias
+
+    @staticmethod
+    def _prioridad(adyacencia, vecinos_contraidos, v):
+        """Diferencia de aristas más vecinos ya contraídos"""
+        atajos = len(JerarquiaContraccion._atajos_necesarios(adyacencia, v))
+        return atajos - len(adyacencia[v]) + vecinos_contraidos[v]
+
+    # ------------------------------------------------------------
+    # Disco
+    # ------------------------------------------------------------
+
+    def guardar(self, ruta=RUTA_JERARQUIA):
+        """Escribe la jerarquía en formato binario"""
+        n = len(self.rango)
+        with open(ruta, 'wb') as f:
+            f.write(ENCABEZADO.pack(MAGIA, self.huella, n, len(self.destinos)))
+            array('i', self.rango).tofile(f)
+            array('i', self.offsets).tofile(f)
+            array('i', self.destinos).tofile(f)
+            array('d', self.pesos).tofile(f)
+            array('i', self.medios).tofile(f)
+        print(f"✅ Jerarquía guardada en {ruta}")
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_JERARQUIA, grafo=None):
+        """Lee la jerarquía; devuelve None si no corresponde a ``grafo``"""
+        with open(ruta, 'rb') as f:
+            magia, huella, n, num_arcos = ENCABEZADO.unpack(f.read(ENCABEZADO.size))
+            if magia != MAGIA:
+                raise ValueError(f"{ruta} no es un archivo de jerarquía")
+            if grafo is not None and (huella != grafo.huella() or n != grafo.n):
+                print(f"⚠️  {ruta} no corresponde al grafo cargado")
+                return None
+
+            def leer(tipo, cantidad):
+                datos = array(tipo)
+                datos.fromfile(f, cantidad)
+                return array('l', datos) if tipo == 'i' else datos
+
+            rango = leer('i', n)
+            offsets = leer('i', n + 1)
+            destinos = leer('i', num_arcos)
+            pesos = leer('d', num_arcos)
+            medios = leer('i', num_arcos)
+
+        return cls(rango, offsets, destinos, pesos, medios, huella)
+
+    # ------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------
+
+    def consultar(self, s, t):
+        """Búsqueda bidireccional ascendente.
+
+        Devuelve (camino con índices internos, costo, nodos asentados).
+        """
+        if s == t:
+            return [s], 0.0, 1
+
+        offsets, destinos, pesos = self.offsets, self.destinos, self.pesos
+        # El espacio de búsqueda es chico: basta con diccionarios
+        distancias = ({s: 0.0}, {t: 0.0})
+        padres = ({s: -1}, {t: -1})
+        colas = ([(0.0, s)], [(0.0, t)])
+        mejor = INFINITO
+        encuentro = -1
+        explorados = 0
+
+        while colas[0] or colas[1]:
+            if colas[0] and (not colas[1] or colas[0][0][0] <= colas[1][0][0]):
+                lado = 0
+            else:
+                lado = 1
+            cola, dist, padre = colas[lado], distancias[lado], padres[lado]
+
+            dist_actual, nodo = heapq.heappop(cola)
+            if dist_actual >= mejor:
+                # Ningún nodo restante de este lado puede mejorar la ruta
+                cola.clear()
+                continue
+            if dist_actual > dist[nodo]:
+                continue
+
+            explorados += 1
+            total = dist_actual + distancias[1 - lado].get(nodo, INFINITO)
+            if total < mejor:
+                mejor = total
+                encuentro = nodo
+
+            for pos in range(offsets[nodo], offsets[nodo + 1]):
+                vecino = destinos[pos]
+                distancia = dist_actual + pesos[pos]
+                if distancia < dist.get(vecino, INFINITO):
+                    dist[vecino] = distancia
+                    padre[vecino] = nodo
+                    heapq.heappush(cola, (distancia, vecino))
+
+        if encuentro == -1:
+            return None, INFINITO, explorados
+
+        # Cadena de nodos de la jerarquía: s → encuentro → t
+        ida = []
+        nodo = encuentro
+        while nodo != -1:
+            ida.append(nodo)
+            nodo = padres[0][nodo]
+        ida.reverse()
+
+        nodo = padres[1][encuentro]
+        while nodo != -1:
+            ida.append(nodo)
+            nodo = padres[1][nodo]
+
+        camino = [ida[0]]
+        for a, b in zip(ida, ida[1:]):
+            self._expandir(a, b, camino)
+
+        return camino, mejor, explorados
+
+    def _expandir(self, a, b, camino):
+        """Agrega a ``camino`` los nodos originales entre ``a`` (excluido) y ``b``"""
+        pila = [(a, b)]
+        while pila:
+            x, y = pila.pop()
+            medio = self._medio(x, y)
+            if medio == -1:
+                camino.append(y)
+            else:
+                pila.append((medio, y))
+                pila.append((x, medio))
+
+    def _medio(self, x, y):
+        """Nodo contraído del arco x-y (lo guarda el extremo de menor rango)"""
+        bajo, alto = (x, y) if self.rango[x] < self.rango[y] else (y, x)
+        for pos in range(self.offsets[bajo], self.offsets[bajo + 1]):
+            if self.destinos[pos] == alto:
+                return self.medios[pos]
+        raise KeyError((x, y))
+
+
+if __name__ == "__main__":
+    print("="*60)
+    print("   PREPROCESAMIENTO CONTRACTION HIERARCHIES")
+    print("="*60 + "\n")
+
+    grafo = GrafoDijkstra()
+    grafo.cargar_desde_csv()
+
+    jerarquia = JerarquiaContraccion.construir(grafo)
+    jerarquia.guardar()
+
+    print(f"\n📊 Arcos ascendentes: {len(jerarquia.destinos)}")
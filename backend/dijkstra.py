@@ -1,96 +1,1065 @@
 import heapq
 import csv
+import itertools
+import math
+import operator
+import time
+import zlib
+from array import array
+from collections.abc import Mapping
+import threading
+
+from compactacion import GrafoCompacto
+from geometria_mapa import GeometriaMapa
+import polilinea
+from indice_espacial import IndiceAristas, IndiceNodos
+
+INFINITO = float('inf')
+# Compartida por todos los grafos del proceso: un grafo recargado nunca
+# repite la versión del anterior aunque tenga la misma huella
+_REVISIONES = itertools.count(1)
+
+# Motores de búsqueda disponibles en calcular_ruta
+ALGORITMOS = {
+    'dijkstra': '_dijkstra',
+    'bidireccional': '_bidireccional',
+    'ch': '_ch',
+    'alt': '_alt',
+    'compacto': '_compacto',
+}
+
+
+HORAS_DIA = 24
+
+# Perfiles de peso por semiarista: a * distancia (km) + b * riesgo
+PERFILES = {
+    'equilibrada': (1.0, 0.1),  # el peso histórico distancia + riesgo*0.1
+    'mas_corta': (1.0, 0.0),
+    'mas_segura': (1.0, 0.5),
+}
+PERFIL_PREDETERMINADO = 'equilibrada'
+
+# Rutas alternativas (método de penalización)
+PENALIZACION = 0.4            # recargo por cada vez que una arista se usa
+MAX_SOLAPAMIENTO = 0.7        # fracción de km compartidos con otra ruta
+MAX_ESTIRAMIENTO = 0.5        # costo máximo relativo al óptimo
+MAX_INTENTOS_ALTERNATIVA = 3  # búsquedas por ruta pedida
+TIEMPO_MAX_ALTERNATIVAS = 0.5
+
+# Unidades del presupuesto de alcance()
+UNIDADES_ALCANCE = ('costo', 'km')
+
+
+class VistaNodos(Mapping):
+    """Vista de solo lectura sobre los nodos del grafo.
+
+    Arma el diccionario de cada nodo bajo demanda a partir de los
+    arreglos paralelos, en lugar de guardar un dict por nodo.
+    """
+
+    def __init__(self, grafo):
+        self._grafo = grafo
+
+    def __getitem__(self, nodo_id):
+        indice = self._grafo.indice_de(nodo_id)
+        if indice is None:
+            raise KeyError(nodo_id)
+        return self._grafo.nodo(indice)
+
+    def __contains__(self, nodo_id):
+        return self._grafo.indice_de(nodo_id) is not None
+
+    def __iter__(self):
+        return iter(self._grafo.ids)
+
+    def __len__(self):
+        return self._grafo.n
+
+
+class EspacioBusqueda:
+    """Arreglos de trabajo de una búsqueda, reutilizables entre consultas.
+
+    Cada entrada lleva el sello de la búsqueda que la escribió y las de
+    sello viejo valen infinito, así que empezar una consulta no recorre
+    los n nodos: el costo depende solo de los nodos que se tocan.
+    """
+
+    def __init__(self, n):
+        self.distancias = array('d', [INFINITO]) * n
+        self.padres = array('l', [-1]) * n
+        self.sellos = array('I', [0]) * n
+        self.sello = 0
+
+    def nueva_busqueda(self, origen=None):
+        """Invalida la búsqueda anterior y siembra ``origen`` con costo 0"""
+        self.sello += 1
+        if self.sello >= 2 ** (8 * self.sellos.itemsize):
+            self.sellos = array('I', [0]) * len(self.sellos)
+            self.sello = 1
+        if origen is not None:
+            self.sembrar(origen, 0.0)
+        return self.sello
+
+    def sembrar(self, nodo, costo):
+        """Agrega ``nodo`` como origen con costo inicial; False si ya tenía uno menor"""
+        if self.sellos[nodo] == self.sello and self.distancias[nodo] <= costo:
+            return False
+        self.distancias[nodo] = costo
+        self.padres[nodo] = -1
+        self.sellos[nodo] = self.sello
+        return True
+
+    def distancia(self, v):
+        """Costo de ``v`` en la búsqueda actual (infinito si no se tocó)"""
+        return self.distancias[v] if self.sellos[v] == self.sello else INFINITO
+
+    def exportar_distancias(self):
+        """Copia densa de las distancias de la búsqueda actual"""
+        sello, sellos, distancias = self.sello, self.sellos, self.distancias
+        return array('d', (distancias[v] if sellos[v] == sello else INFINITO
+                           for v in range(len(distancias))))
+
 
 class GrafoDijkstra:
+    """Grafo de calles en formato CSR (compressed sparse row).
+
+    Los vecinos del nodo interno ``i`` son ``destinos[offsets[i]:offsets[i+1]]``
+    con sus pesos en ``pesos`` y el id de la arista original en ``adj_arista``.
+    Los atributos de nodos y aristas viven en arreglos paralelos.
+    """
+
     def __init__(self):
-        self.nodos = {}
-        self.grafo = {}
-    
-    def cargar_desde_csv(self):
+        self.n = 0
+        self.m = 0
+        # Nodos (índice interno 0..n-1)
+        self.ids = array('q')
+        self.lat = array('d')
+        self.lon = array('d')
+        self.riesgo = array('B')
+        self.nombres = []
+        self._indice = None  # None si los ids ya son 0..n-1
+        # Aristas originales (no dirigidas)
+        self.arista_u = array('l')
+        self.arista_v = array('l')
+        self.arista_dist = array('d')
+        self.arista_riesgo = array('B')
+        self.arista_calle = array('l')
+        self.calles = []
+        # Adyacencia CSR (cada arista aparece en ambos sentidos)
+        self.offsets = array('l', [0])
+        self.destinos = array('l')
+        self.adj_arista = array('l')
+        self.pesos = array('d')
+        # Distancia y riesgo por semiarista: los pesos de cada perfil se
+        # combinan a partir de ellos (ver pesos_para)
+        self.distancia_semi = array('d')
+        self.riesgo_semi = array('B')
+        self._pesos_perfil = {}  # (perfil, hora) -> pesos
+        self.nodos = VistaNodos(self)
+        # Datos derivados que se calculan la primera vez que se usan
+        self._indice_nodos = None
+        self._indice_aristas = None
+        # Grafo de intersecciones sin nodos de paso (ver compactacion.py)
+        self.compacto = None
+        # Tramos simplificados por zoom para dibujar (ver geometria_mapa.py)
+        self._geometria = None
+        # Componente conexa de cada nodo (0 = la más grande)
+        self.componente = array('l')
+        self.tamanos_componentes = array('l')
+        # Riesgo por hora del día (ver establecer_riesgo_horario)
+        self.riesgo_hora = None
+        self.riesgo_hora_semi = None
+        self._huella = None
+        # Cambia cada vez que se recargan el grafo o los datos de riesgo
+        self.version = None
+        self._revision = 0
+        # Espacios de búsqueda por hilo (ver EspacioBusqueda)
+        self._local = threading.local()
+        # Contraction Hierarchy precalculada (ver contraccion.py)
+        self.jerarquia = None
+        # Distancias a landmarks para ALT (ver landmarks.py)
+        self.landmarks = None
+
+    def cargar_desde_csv(self, ruta_nodos='data/nodos_juliaca.csv',
+                         ruta_aristas='data/aristas_juliaca.csv'):
         """Carga nodos y aristas desde CSV"""
         # Cargar nodos
-        with open('data/nodos_juliaca.csv', 'r', encoding='utf-8') as f:
+        internados = {}
+        with open(ruta_nodos, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
-                nodo_id = int(row['id'])
-                self.nodos[nodo_id] = {
-                    'nombre': row['nombre'],
-                    'lat': float(row['latitud']),
-                    'lon': float(row['longitud']),
-                    'riesgo': int(row['riesgo'])
-                }
-                self.grafo[nodo_id] = []
-        
-        print(f"✅ {len(self.nodos)} nodos cargados")
-        
+                nombre = row['nombre']
+                self.ids.append(int(row['id']))
+                self.lat.append(float(row['latitud']))
+                self.lon.append(float(row['longitud']))
+                self.riesgo.append(int(row['riesgo']))
+                self.nombres.append(internados.setdefault(nombre, nombre))
+
+        self.n = len(self.ids)
+        if any(nodo_id != i for i, nodo_id in enumerate(self.ids)):
+            self._indice = {nodo_id: i for i, nodo_id in enumerate(self.ids)}
+
+        print(f"✅ {self.n} nodos cargados")
+
         # Cargar aristas
-        with open('data/aristas_juliaca.csv', 'r', encoding='utf-8') as f:
+        calle_a_id = {}
+        with open(ruta_aristas, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
-                origen = int(row['origen'])
-                destino = int(row['destino'])
-                distancia = float(row['distancia'])
-                riesgo = int(row['riesgo'])
-                
-                # Peso combinado: distancia + riesgo
-                peso = distancia + (riesgo * 0.1)
-                
-                self.grafo[origen].append((destino, peso))
-                self.grafo[destino].append((origen, peso))  # Bidireccional
-        
+                origen = self.indice_de(int(row['origen']))
+                destino = self.indice_de(int(row['destino']))
+                if origen is None or destino is None:
+                    continue
+
+                calle = row.get('nombre') or ''
+                if calle not in calle_a_id:
+                    calle_a_id[calle] = len(self.calles)
+                    self.calles.append(calle)
+
+                self.arista_u.append(origen)
+                self.arista_v.append(destino)
+                self.arista_dist.append(float(row['distancia']))
+                self.arista_riesgo.append(int(row['riesgo']))
+                self.arista_calle.append(calle_a_id[calle])
+
+        self.m = len(self.arista_u)
+        self._construir_csr()
+        self._nueva_version()
+
         print(f"✅ Grafo construido")
-    
-    def calcular_ruta(self, origen, destino):
-        """Dijkstra: encuentra la ruta más segura"""
-        if origen not in self.grafo or destino not in self.grafo:
+
+    def _construir_csr(self):
+        """Arma offsets/destinos/pesos a partir de la lista de aristas"""
+        n, m = self.n, self.m
+        grado = array('l', [0]) * (n + 1)
+        for e in range(m):
+            grado[self.arista_u[e] + 1] += 1
+            grado[self.arista_v[e] + 1] += 1
+
+        offsets = grado
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        destinos = array('l', [0]) * (2 * m)
+        adj_arista = array('l', [0]) * (2 * m)
+        siguiente = array('l', offsets[:n])
+
+        # Se respeta el orden del archivo para que los empates se resuelvan
+        # igual que con las listas de adyacencia
+        for e in range(m):
+            u, v = self.arista_u[e], self.arista_v[e]
+
+            pos = siguiente[u]
+            destinos[pos], adj_arista[pos] = v, e
+            siguiente[u] = pos + 1
+
+            pos = siguiente[v]
+            destinos[pos], adj_arista[pos] = u, e
+            siguiente[v] = pos + 1
+
+        self.offsets = offsets
+        self.destinos = destinos
+        self.adj_arista = adj_arista
+        self.distancia_semi = array('d', map(self.arista_dist.__getitem__, adj_arista))
+        self.riesgo_semi = array('B', map(self.arista_riesgo.__getitem__, adj_arista))
+        # Peso combinado base: distancia + riesgo
+        self.pesos = self._combinar(PERFIL_PREDETERMINADO, self.riesgo_semi)
+        self._etiquetar_componentes()
+        self._reiniciar_derivados()
+
+    def _reiniciar_derivados(self):
+        """Descarta todo lo calculado a partir de los arreglos del grafo"""
+        self._pesos_perfil = {}
+        self._indice_nodos = None
+        self._indice_aristas = None
+        self.compacto = None
+        self._geometria = None
+
+    def _etiquetar_componentes(self):
+        """Etiqueta cada nodo con su componente conexa, de la más grande a la más chica"""
+        n, offsets, destinos = self.n, self.offsets, self.destinos
+        etiquetas = array('l', [-1]) * n
+        tamanos = []
+        for inicio in range(n):
+            if etiquetas[inicio] != -1:
+                continue
+            c = len(tamanos)
+            etiquetas[inicio] = c
+            pila = [inicio]
+            tamano = 0
+            while pila:
+                u = pila.pop()
+                tamano += 1
+                for pos in range(offsets[u], offsets[u + 1]):
+                    v = destinos[pos]
+                    if etiquetas[v] == -1:
+                        etiquetas[v] = c
+                        pila.append(v)
+            tamanos.append(tamano)
+
+        orden = sorted(range(len(tamanos)), key=lambda c: (-tamanos[c], c))
+        renumeracion = array('l', [0]) * len(tamanos)
+        for nueva, c in enumerate(orden):
+            renumeracion[c] = nueva
+        self.componente = array('l', map(renumeracion.__getitem__, etiquetas))
+        self.tamanos_componentes = array('l', (tamanos[c] for c in orden))
+
+    def conectados(self, s, t):
+        """True si los nodos internos ``s`` y ``t`` están en la misma componente (O(1))"""
+        return self.componente[s] == self.componente[t]
+
+    def reporte_componentes(self, limite=20):
+        """Tamaño de las componentes conexas, para depurar los datos"""
+        aristas = array('l', [0]) * len(self.tamanos_componentes)
+        for u in self.arista_u:
+            aristas[self.componente[u]] += 1
+        ejemplos = {}
+        for i in range(self.n):
+            ejemplos.setdefault(self.componente[i], self.ids[i])
+
+        principal = self.tamanos_componentes[0] if self.n else 0
+        return {
+            'total': len(self.tamanos_componentes),
+            'nodos': self.n,
+            'nodos_principal': principal,
+            'nodos_fuera_principal': self.n - principal,
+            'aislados': sum(1 for tamano in self.tamanos_componentes if tamano == 1),
+            'componentes': [{
+                'componente': c,
+                'nodos': self.tamanos_componentes[c],
+                'aristas': aristas[c],
+                'ejemplo': ejemplos[c]
+            } for c in range(min(limite, len(self.tamanos_componentes)))]
+        }
+
+    def indice_de(self, nodo_id):
+        """Traduce un id de nodo externo a su índice interno (o None)"""
+        if self._indice is not None:
+            return self._indice.get(nodo_id)
+        if isinstance(nodo_id, int) and 0 <= nodo_id < self.n:
+            return nodo_id
+        return None
+
+    def nodo(self, i):
+        """Diccionario con los datos del nodo interno ``i``"""
+        return {
+            'nombre': self.nombres[i],
+            'lat': self.lat[i],
+            'lon': self.lon[i],
+            'riesgo': self.riesgo[i]
+        }
+
+    def nodos_cercanos(self, lat, lon, k=1):
+        """Los ``k`` nodos más cercanos a (lat, lon), del más cercano al más lejano"""
+        cercanos = []
+        for km, i in self._indice_de_nodos().cercanos(lat, lon, k):
+            nodo = self.nodo(i)
+            nodo['id'] = self.ids[i]
+            nodo['distancia_m'] = round(km * 1000, 1)
+            cercanos.append(nodo)
+        return cercanos
+
+    def _indice_de_nodos(self):
+        if self._indice_nodos is None:
+            self._indice_nodos = IndiceNodos(self.lat, self.lon)
+        return self._indice_nodos
+
+    def geometria(self):
+        """Tramos de calle para dibujar por rectángulo y zoom (se arma la primera vez)"""
+        if self._geometria is None:
+            self._geometria = GeometriaMapa(self, self.compactado(), self._indice_de_nodos())
+        return self._geometria
+
+    def punto_sobre_calle(self, lat, lon):
+        """Calle más cercana a (lat, lon): arista, nombre y punto proyectado"""
+        if self._indice_aristas is None:
+            self._indice_aristas = IndiceAristas(self.lat, self.lon, self.arista_u, self.arista_v)
+        cercana = self._indice_aristas.cercana(lat, lon)
+        if cercana is None:
+            return None
+
+        km, e, fraccion, lat_proyectada, lon_proyectada = cercana
+        return {
+            'arista': e,
+            'calle': self.calles[self.arista_calle[e]],
+            'origen': self.ids[self.arista_u[e]],
+            'destino': self.ids[self.arista_v[e]],
+            'fraccion': fraccion,
+            'lat': lat_proyectada,
+            'lon': lon_proyectada,
+            'distancia_m': round(km * 1000, 1)
+        }
+
+    def huella(self):
+        """CRC32 de la topología y los pesos; identifica los datos cargados.
+
+        Los enteros se toman siempre de 8 bytes: en memoria son array('l'),
+        que en Windows mide 4, y en la instantánea son 'q'.
+        """
+        if self._huella is None:
+            crc = 0
+            for datos in (self.ids, self.arista_u, self.arista_v, self.pesos):
+                if datos.itemsize != 8:
+                    datos = array('q', datos)
+                crc = zlib.crc32(datos.tobytes(), crc)
+            self._huella = crc
+        return self._huella
+
+    def _nueva_version(self):
+        """Marca que cambiaron los datos: invalida cachés derivados"""
+        self._huella = None
+        self._revision = next(_REVISIONES)
+        self.version = f"{self.huella():08x}-{self._revision}"
+
+    def algoritmos_disponibles(self):
+        """Algoritmos utilizables con los datos precalculados cargados"""
+        requisitos = {'ch': self.jerarquia, 'alt': self.landmarks}
+        return [a for a in ALGORITMOS if a not in requisitos or requisitos[a] is not None]
+
+    def exportar_nodos(self):
+        """Dict {id: nodo} listo para serializar"""
+        return {self.ids[i]: self.nodo(i) for i in range(self.n)}
+
+    def exportar_aristas(self):
+        """Lista de aristas con las coordenadas de sus extremos, para dibujar"""
+        aristas = []
+        for e in range(self.m):
+            u, v = self.arista_u[e], self.arista_v[e]
+            aristas.append({
+                'origen': {'id': self.ids[u], 'lat': self.lat[u], 'lon': self.lon[u]},
+                'destino': {'id': self.ids[v], 'lat': self.lat[v], 'lon': self.lon[v]},
+                'riesgo': self.arista_riesgo[e]
+            })
+        return aristas
+
+    def calcular_ruta(self, origen, destino, algoritmo='dijkstra', hora=None, perfil=None):
+        """Encuentra la ruta más segura con el algoritmo indicado.
+
+        Con ``hora`` (0-23) se usan los pesos de riesgo de esa hora y con
+        ``perfil`` (ver PERFILES) otra combinación de distancia y riesgo.
+        """
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(f"Algoritmo desconocido: {algoritmo}")
+        pesos = self.pesos_para(hora, perfil)
+        if algoritmo == 'alt' and not self.perfil_acotado(perfil):
+            raise ValueError(f"Los landmarks no acotan el perfil '{perfil}'")
+
+        s = self.indice_de(origen)
+        t = self.indice_de(destino)
+        if s is None or t is None or not self.conectados(s, t):
+            return None
+
+        camino, costo, explorados = getattr(self, ALGORITMOS[algoritmo])(s, t, pesos)
+        if camino is None:
+            return None
+
+        resultado = self._armar_resultado(camino, costo)
+        resultado['algoritmo'] = algoritmo
+        resultado['nodos_explorados'] = explorados
+        if hora is not None:
+            resultado['hora'] = hora
+        if perfil is not None:
+            resultado['perfil'] = perfil
+        return resultado
+
+    def calcular_ruta_entre(self, origen, destino, hora=None, perfil=None):
+        """Ruta (Dijkstra) entre nodos o puntos en medio de una calle.
+
+        ``origen`` y ``destino`` son ids de nodo o tuplas (lat, lon). Un
+        punto se proyecta a la calle más cercana y la búsqueda parte de
+        los dos extremos de esa arista con el costo del tramo parcial como
+        costo inicial (varios orígenes). El resultado agrega 'inicio' y
+        'fin' con la proyección de cada punto.
+        """
+        pesos = self.pesos_para(hora, perfil)
+        inicio = self._extremo(origen, pesos)
+        fin = self._extremo(destino, pesos)
+        if inicio is None or fin is None:
+            return None
+        (semillas, punto_inicio), (metas, punto_fin) = inicio, fin
+        if not self.conectados(semillas[0][0], metas[0][0]):
+            return None
+
+        espacio, explorados = self.arbol_caminos(None, pesos=pesos, semillas=semillas,
+                                                 metas=metas)
+        costo, llegada = min((espacio.distancia(v) + resto, v) for v, resto in metas)
+        camino = self._reconstruir(espacio.padres, llegada) if costo < INFINITO else None
+
+        # Ambos puntos en la misma calle: se puede ir directo por ella
+        if punto_inicio and punto_fin and punto_inicio['arista'] == punto_fin['arista']:
+            e = punto_inicio['arista']
+            directo = abs(punto_inicio['fraccion'] - punto_fin['fraccion']) * pesos[self._posicion_arista(e)]
+            if directo <= costo:
+                costo, camino = directo, []
+        if camino is None:
+            return None
+
+        resultado = self._armar_resultado(camino, costo)
+        if not camino:
+            resultado['riesgo_promedio'] = self.arista_riesgo[punto_inicio['arista']]
+        resultado['algoritmo'] = 'dijkstra'
+        resultado['nodos_explorados'] = explorados
+        if punto_inicio:
+            resultado['inicio'] = punto_inicio
+        if punto_fin:
+            resultado['fin'] = punto_fin
+        if hora is not None:
+            resultado['hora'] = hora
+        if perfil is not None:
+            resultado['perfil'] = perfil
+        return resultado
+
+    def _extremo(self, punto, pesos):
+        """(pares (nodo, costo parcial), proyección o None) de un extremo de ruta"""
+        if isinstance(punto, tuple):
+            proyeccion = self.punto_sobre_calle(*punto)
+            if proyeccion is None:
+                return None
+            e, fraccion = proyeccion['arista'], proyeccion['fraccion']
+            peso = pesos[self._posicion_arista(e)]
+            return [(self.arista_u[e], fraccion * peso),
+                    (self.arista_v[e], (1 - fraccion) * peso)], proyeccion
+
+        i = self.indice_de(punto)
+        return None if i is None else ([(i, 0.0)], None)
+
+    def _posicion_arista(self, e):
+        """Semiarista CSR de la arista ``e`` que sale de su origen"""
+        u = self.arista_u[e]
+        for pos in range(self.offsets[u], self.offsets[u + 1]):
+            if self.adj_arista[pos] == e:
+                return pos
+        raise KeyError(e)
+
+    def establecer_riesgo_horario(self, riesgo_por_hora):
+        """Fija el riesgo de cada arista para cada hora del día.
+
+        ``riesgo_por_hora`` son 24 arreglos indexados por arista (ver
+        riesgo_horario.py). Los pesos de cada hora se combinan la primera
+        vez que se piden (pesos_para; servidor.py los arma antes del fork).
+        El riesgo horario nunca puede ser menor que el base: así las cotas
+        de ALT, que se calculan con los pesos base, siguen siendo válidas.
+        """
+        if len(riesgo_por_hora) != HORAS_DIA:
+            raise ValueError(f"Se esperaban {HORAS_DIA} arreglos de riesgo")
+
+        riesgo_hora_semi = []
+        for riesgos in riesgo_por_hora:
+            if any(map(operator.lt, riesgos, self.arista_riesgo)):
+                raise ValueError("El riesgo horario no puede ser menor que el base")
+            riesgo_hora_semi.append(array('B', map(riesgos.__getitem__, self.adj_arista)))
+
+        self.riesgo_hora = riesgo_por_hora
+        self.riesgo_hora_semi = riesgo_hora_semi
+        self._pesos_perfil = {}
+        self._nueva_version()
+
+    def pesos_para(self, hora=None, perfil=None):
+        """Pesos por semiarista para la hora y el perfil indicados.
+
+        Sin hora ni perfil son los pesos base (``pesos``). Los demás se
+        combinan la primera vez que se piden y quedan en caché: cambiar de
+        perfil no requiere recargar el grafo.
+        """
+        perfil = PERFIL_PREDETERMINADO if perfil is None else perfil
+        if perfil not in PERFILES:
+            raise ValueError(f"Perfil desconocido: {perfil}")
+        if hora is not None:
+            if self.riesgo_hora_semi is None:
+                raise ValueError("No hay riesgo horario cargado")
+            if not 0 <= hora < HORAS_DIA:
+                raise ValueError(f"Hora fuera de rango: {hora}")
+        elif perfil == PERFIL_PREDETERMINADO:
+            return self.pesos
+
+        pesos = self._pesos_perfil.get((perfil, hora))
+        if pesos is None:
+            riesgos = self.riesgo_semi if hora is None else self.riesgo_hora_semi[hora]
+            pesos = self._combinar(perfil, riesgos)
+            self._pesos_perfil[(perfil, hora)] = pesos
+        return pesos
+
+    def perfil_acotado(self, perfil):
+        """True si los pesos de ``perfil`` nunca son menores que los base.
+
+        Es lo que necesitan las cotas precalculadas con los pesos base
+        (landmarks) para seguir siendo admisibles.
+        """
+        a, b = PERFILES[PERFIL_PREDETERMINADO if perfil is None else perfil]
+        a_base, b_base = PERFILES[PERFIL_PREDETERMINADO]
+        return a >= a_base and b >= b_base
+
+    def _combinar(self, perfil, riesgos):
+        """a * distancia + b * riesgo para cada semiarista"""
+        a, b = PERFILES[perfil]
+        return array('d', map(lambda d, r: a * d + b * r, self.distancia_semi, riesgos))
+
+    def _espacios(self):
+        """Par de espacios de búsqueda del hilo actual (ida y vuelta)"""
+        espacios = getattr(self._local, 'espacios', None)
+        if espacios is None or len(espacios[0].distancias) != self.n:
+            espacios = (EspacioBusqueda(self.n), EspacioBusqueda(self.n))
+            self._local.espacios = espacios
+        return espacios
+
+    def arbol_caminos(self, s, objetivos=None, limite=INFINITO, pesos=None, asentados=None,
+                      lado=0, semillas=None, csr=None, metas=None):
+        """Dijkstra de uno a muchos sobre los arreglos CSR.
+
+        Se detiene cuando se asentaron todos los ``objetivos`` (índices
+        internos) o cuando el costo supera ``limite``; sin ninguno de los
+        dos recorre toda la componente de ``s``. ``pesos`` reemplaza los
+        pesos por defecto y ``asentados`` (una lista) recibe los nodos en
+        el orden en que se asientan. ``lado`` elige cuál de los dos
+        espacios del hilo usar. ``semillas`` (pares (nodo, costo inicial))
+        reemplaza a ``s`` para búsquedas con varios orígenes y ``csr``
+        (offsets, destinos) recorre otro grafo con los mismos índices.
+        ``metas`` (pares (nodo, costo restante)) es para rutas con varios
+        puntos de llegada: la búsqueda termina cuando el menor costo en la
+        cola ya no mejora la mejor llegada asentada (distancia + resto),
+        sin esperar a asentar todas.
+        Devuelve (espacio, nodos asentados). El espacio es del hilo y se
+        reutiliza en la próxima búsqueda: hay que leerlo antes de buscar
+        de nuevo.
+        """
+        offsets, destinos = (self.offsets, self.destinos) if csr is None else csr
+        pesos = self.pesos if pesos is None else pesos
+        espacio = self._espacios()[lado]
+        sello = espacio.nueva_busqueda()
+        distancias, padres, sellos = espacio.distancias, espacio.padres, espacio.sellos
+
+        pendientes = set(objetivos) if objetivos is not None else None
+        restos = None
+        if metas is not None:
+            restos = {}
+            for v, resto in metas:  # una cadena cerrada llega dos veces al mismo nodo
+                restos[v] = min(resto, restos.get(v, INFINITO))
+        mejor_llegada = INFINITO
+        semillas = ((s, 0.0),) if semillas is None else semillas
+        cola = [(costo, v) for v, costo in semillas if espacio.sembrar(v, costo)]
+        heapq.heapify(cola)
+        heappop, heappush = heapq.heappop, heapq.heappush
+        explorados = 0
+
+        while cola:
+            dist_actual, nodo_actual = heappop(cola)
+
+            # Entrada vieja de la cola: el nodo ya se asentó con menor costo
+            if dist_actual > distancias[nodo_actual]:
+                continue
+            if dist_actual > limite or dist_actual >= mejor_llegada:
+                break
+
+            explorados += 1
+            if asentados is not None:
+                asentados.append(nodo_actual)
+            if pendientes is not None:
+                pendientes.discard(nodo_actual)
+                if not pendientes:
+                    break
+            if restos is not None and nodo_actual in restos:
+                mejor_llegada = min(mejor_llegada, dist_actual + restos[nodo_actual])
+
+            for pos in range(offsets[nodo_actual], offsets[nodo_actual + 1]):
+                vecino = destinos[pos]
+                distancia = dist_actual + pesos[pos]
+
+                if sellos[vecino] != sello or distancia < distancias[vecino]:
+                    distancias[vecino] = distancia
+                    padres[vecino] = nodo_actual
+                    sellos[vecino] = sello
+                    heappush(cola, (distancia, vecino))
+
+        return espacio, explorados
+
+    def _caminos_desde(self, origen, destinos):
+        """{destino: (camino, costo) o None} con un solo árbol de caminos desde ``origen``"""
+        s = self.indice_de(origen)
+        indices = {destino: self.indice_de(destino) for destino in destinos}
+        if s is None:
+            return {destino: None for destino in indices}
+
+        # Los destinos de otra componente no se buscan: el árbol no los alcanza
+        objetivos = {t for t in indices.values() if t is not None and self.conectados(s, t)}
+        espacio, _ = self.arbol_caminos(s, objetivos)
+
+        caminos = {}
+        for destino, t in indices.items():
+            if t is None or espacio.distancia(t) == INFINITO:
+                caminos[destino] = None
+            else:
+                caminos[destino] = (self._reconstruir(espacio.padres, t), espacio.distancia(t))
+        return caminos
+
+    def calcular_rutas_desde(self, origen, destinos):
+        """Rutas de ``origen`` a varios destinos con un solo árbol de caminos.
+
+        Devuelve {destino: resultado o None}.
+        """
+        return {destino: None if par is None else self._armar_resultado(*par)
+                for destino, par in self._caminos_desde(origen, destinos).items()}
+
+    def metricas_desde(self, origen, destinos):
+        """Costo ponderado, km y riesgo promedio de ``origen`` a cada destino.
+
+        Como calcular_rutas_desde pero sin armar las rutas completas:
+        devuelve {destino: (costo, km, riesgo_promedio) o None}.
+        """
+        metricas = {}
+        for destino, par in self._caminos_desde(origen, destinos).items():
+            if par is None:
+                metricas[destino] = None
+                continue
+            camino, costo = par
+            km = sum(self.arista_dist[self.adj_arista[pos]] for pos in self._posiciones_camino(camino))
+            riesgo = sum(self.riesgo[i] for i in camino) / len(camino)
+            metricas[destino] = (costo, km, riesgo)
+        return metricas
+
+    def calcular_alternativas(self, origen, destino, k=3, hora=None, perfil=None,
+                              tiempo_max=TIEMPO_MAX_ALTERNATIVAS):
+        """Hasta ``k`` rutas distintas entre origen y destino (método de penalización).
+
+        Un Dijkstra desde el destino, detenido al asentar el origen, da la
+        primera ruta y una cota inferior exacta h(v) = min(d(v, t), R) que
+        se reutiliza en todas las búsquedas siguientes: penalizar aristas
+        solo sube pesos, así que la cota sigue siendo consistente. Cada
+        ruta encarece sus aristas y se repite A* con los pesos penalizados.
+        Se descartan rutas que se solapan demasiado o que se alejan mucho
+        del costo óptimo; el número de búsquedas y el tiempo están acotados.
+        """
+        base = self.pesos_para(hora, perfil)
+        s = self.indice_de(origen)
+        t = self.indice_de(destino)
+        if s is None or t is None or not self.conectados(s, t):
+            return []
+
+        vuelta, _ = self.arbol_caminos(t, objetivos=(s,), pesos=base, lado=1)
+        optimo = vuelta.distancia(s)
+        if optimo == INFINITO:
+            return []
+
+        # Primera ruta: se sigue el árbol de vuelta desde s
+        camino = [s]
+        while camino[-1] != t:
+            camino.append(vuelta.padres[camino[-1]])
+
+        def heuristica(v, distancias=vuelta.distancias, sellos=vuelta.sellos,
+                       sello=vuelta.sello, radio=optimo):
+            d = distancias[v] if sellos[v] == sello else INFINITO
+            return d if d < radio else radio
+
+        pesos = array('d', base)
+        elegidas = []
+        inicio = time.perf_counter()
+
+        for _ in range(k * MAX_INTENTOS_ALTERNATIVA):
+            posiciones = self._posiciones_camino(camino, base)
+            usadas = {self.adj_arista[pos] for pos in posiciones}
+            km = sum(self.arista_dist[self.adj_arista[pos]] for pos in posiciones)
+            costo = sum(base[pos] for pos in posiciones)
+
+            solapamiento = max((sum(self.arista_dist[e] for e in usadas & otra) / km if km else 1.0
+                                for _, otra in elegidas), default=0.0)
+
+            if solapamiento <= MAX_SOLAPAMIENTO and costo <= optimo * (1 + MAX_ESTIRAMIENTO):
+                resultado = self._armar_resultado(camino, costo)
+                resultado['distancia_km'] = km
+                resultado['solapamiento'] = solapamiento
+                elegidas.append((resultado, usadas))
+                if len(elegidas) == k:
+                    break
+
+            if time.perf_counter() - inicio > tiempo_max:
+                break
+
+            for e in usadas:
+                for extremo in (self.arista_u[e], self.arista_v[e]):
+                    for pos in range(self.offsets[extremo], self.offsets[extremo + 1]):
+                        if self.adj_arista[pos] == e:
+                            pesos[pos] *= 1 + PENALIZACION
+
+            camino, _, _ = self._buscar_astar(s, t, heuristica, pesos)
+            if camino is None:
+                break
+
+        return [resultado for resultado, _ in elegidas]
+
+    def alcance(self, origen, presupuesto, unidad='costo', perfil=None):
+        """Nodos y aristas alcanzables desde ``origen`` dentro del presupuesto.
+
+        ``unidad`` es 'costo' (peso del ``perfil``, por defecto distancia +
+        riesgo*0.1) o 'km' (distancia pura). Una arista cuenta si se puede
+        recorrer entera.
+        """
+        s = self.indice_de(origen)
+        if s is None:
             return None
-        
-        distancias = {nodo: float('inf') for nodo in self.nodos}
-        distancias[origen] = 0
-        padres = {nodo: None for nodo in self.nodos}
-        
-        cola = [(0, origen)]
-        visitados = set()
-        
+        if unidad not in UNIDADES_ALCANCE:
+            raise ValueError(f"Unidad desconocida: {unidad}")
+
+        pesos = self.pesos_para(perfil=perfil) if unidad == 'costo' else self.distancia_semi
+        asentados = []
+        espacio, _ = self.arbol_caminos(s, limite=presupuesto, pesos=pesos,
+                                        asentados=asentados)
+        distancias = espacio.distancias
+
+        aristas = []
+        for u in asentados:
+            for pos in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.destinos[pos]
+                # Cada arista se reporta una vez, desde su extremo más cercano
+                if espacio.distancia(v) > presupuesto:
+                    continue
+                if (distancias[u], u) < (distancias[v], v) and distancias[u] + pesos[pos] <= presupuesto:
+                    aristas.append(self.ids[u])
+                    aristas.append(self.ids[v])
+
+        return {
+            'origen': origen,
+            'unidad': unidad,
+            'presupuesto': presupuesto,
+            'nodos': [self.ids[u] for u in asentados],
+            'costos': [round(distancias[u], 4) for u in asentados],
+            'aristas': aristas
+        }
+
+    def resumir_ruta(self, resultado, hora=None, perfil=None):
+        """Versión liviana de un resultado de ruta: crece con las calles, no con los nodos.
+
+        Reemplaza 'nodos' por 'polilinea' (ver polilinea.py; incluye los
+        puntos de 'inicio' y 'fin' si la ruta parte o llega a mitad de
+        cuadra) y 'tramos': un resumen por cada calle recorrida, con
+        'desde'/'hasta' como posiciones en 'camino'.
+        """
+        camino = [self.indice_de(nodo_id) for nodo_id in resultado['camino']]
+        pesos = self.pesos_para(hora, perfil)
+
+        tramos = []
+        for i, pos in enumerate(self._posiciones_camino(camino, pesos)):
+            e = self.adj_arista[pos]
+            km, riesgo = self.arista_dist[e], self.arista_riesgo[e]
+            calle = self.calles[self.arista_calle[e]]
+            if tramos and tramos[-1]['calle'] == calle:
+                tramo = tramos[-1]
+                tramo['hasta'] = i + 1
+                tramo['distancia_km'] += km
+                tramo['riesgo_promedio'] += riesgo * km
+                tramo['riesgo_max'] = max(tramo['riesgo_max'], riesgo)
+            else:
+                tramos.append({'calle': calle, 'desde': i, 'hasta': i + 1, 'distancia_km': km,
+                               'riesgo_promedio': riesgo * km, 'riesgo_max': riesgo})
+        for tramo in tramos:
+            # Promedio ponderado por la longitud de cada cuadra
+            if tramo['distancia_km'] > 0:
+                tramo['riesgo_promedio'] = round(tramo['riesgo_promedio'] / tramo['distancia_km'], 1)
+            else:
+                tramo['riesgo_promedio'] = tramo['riesgo_max']
+            tramo['distancia_km'] = round(tramo['distancia_km'], 3)
+
+        puntos = [(self.lat[i], self.lon[i]) for i in camino]
+        if 'inicio' in resultado:
+            puntos.insert(0, (resultado['inicio']['lat'], resultado['inicio']['lon']))
+        if 'fin' in resultado:
+            puntos.append((resultado['fin']['lat'], resultado['fin']['lon']))
+
+        resumen = {clave: valor for clave, valor in resultado.items() if clave != 'nodos'}
+        resumen['polilinea'] = polilinea.codificar(puntos)
+        resumen['tramos'] = tramos
+        resumen.setdefault('distancia_km', round(sum(t['distancia_km'] for t in tramos), 3))
+        return resumen
+
+    def _posiciones_camino(self, camino, pesos=None):
+        """Semiarista CSR (la de menor peso) usada en cada paso de ``camino``"""
+        pesos = self.pesos if pesos is None else pesos
+        posiciones = []
+        for u, v in zip(camino, camino[1:]):
+            mejor, peso_mejor = -1, INFINITO
+            for pos in range(self.offsets[u], self.offsets[u + 1]):
+                if self.destinos[pos] == v and pesos[pos] < peso_mejor:
+                    mejor, peso_mejor = pos, pesos[pos]
+            posiciones.append(mejor)
+        return posiciones
+
+    def _dijkstra(self, s, t, pesos):
+        """Dijkstra: se detiene al asentar ``t``"""
+        espacio, explorados = self.arbol_caminos(s, (t,), pesos=pesos)
+        if espacio.distancia(t) == INFINITO:
+            return None, INFINITO, explorados
+        return self._reconstruir(espacio.padres, t), espacio.distancia(t), explorados
+
+    def _alt(self, s, t, pesos):
+        """A* con cotas de landmarks (ALT) cargadas en ``landmarks``"""
+        if self.landmarks is None:
+            raise ValueError("No hay landmarks cargados")
+        return self._buscar_astar(s, t, self.landmarks.heuristica(s, t), pesos)
+
+    def _buscar_astar(self, s, t, heuristica, pesos=None):
+        """A* genérico; ``heuristica(v)`` debe ser consistente"""
+        offsets, destinos = self.offsets, self.destinos
+        pesos = self.pesos if pesos is None else pesos
+        espacio = self._espacios()[0]
+        sello = espacio.nueva_busqueda(s)
+        distancias, padres, sellos = espacio.distancias, espacio.padres, espacio.sellos
+
+        cola = [(0.0, 0.0, s)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        explorados = 0
+
         while cola:
-            dist_actual, nodo_actual = heapq.heappop(cola)
-            
-            if nodo_actual in visitados:
+            _, dist_actual, nodo_actual = heappop(cola)
+
+            if dist_actual > distancias[nodo_actual]:
                 continue
-            
-            visitados.add(nodo_actual)
-            
-            if nodo_actual == destino:
+
+            explorados += 1
+            if nodo_actual == t:
                 break
-            
-            for vecino, peso in self.grafo[nodo_actual]:
-                distancia = dist_actual + peso
-                
-                if distancia < distancias[vecino]:
+
+            for pos in range(offsets[nodo_actual], offsets[nodo_actual + 1]):
+                vecino = destinos[pos]
+                distancia = dist_actual + pesos[pos]
+
+                if sellos[vecino] != sello or distancia < distancias[vecino]:
                     distancias[vecino] = distancia
                     padres[vecino] = nodo_actual
-                    heapq.heappush(cola, (distancia, vecino))
-        
-        # Reconstruir camino
+                    sellos[vecino] = sello
+                    heappush(cola, (distancia + heuristica(vecino), distancia, vecino))
+
+        if espacio.distancia(t) == INFINITO:
+            return None, INFINITO, explorados
+        return self._reconstruir(padres, t), distancias[t], explorados
+
+    def _bidireccional(self, s, t, pesos):
+        """Dijkstra desde ambos extremos (el grafo es no dirigido).
+
+        Se detiene cuando la suma de los topes de ambas colas ya no puede
+        mejorar el mejor camino encontrado (``mejor``).
+        """
+        offsets, destinos = self.offsets, self.destinos
+        if s == t:
+            return [s], 0.0, 1
+
+        espacios = self._espacios()
+        sellos_lado = (espacios[0].nueva_busqueda(s), espacios[1].nueva_busqueda(t))
+
+        colas = ([(0.0, s)], [(0.0, t)])
+        heappop, heappush = heapq.heappop, heapq.heappush
+        mejor = INFINITO
+        encuentro = -1
+        explorados = 0
+
+        while colas[0] and colas[1]:
+            tope_ida, tope_vuelta = colas[0][0][0], colas[1][0][0]
+            if tope_ida + tope_vuelta >= mejor:
+                break
+
+            # Se avanza el lado con el tope más bajo
+            lado = 0 if tope_ida <= tope_vuelta else 1
+            cola, espacio, otro = colas[lado], espacios[lado], espacios[1 - lado]
+            dist, padre, sellos, sello = (espacio.distancias, espacio.padres,
+                                          espacio.sellos, sellos_lado[lado])
+            dist_otro, sellos_otro, sello_otro = otro.distancias, otro.sellos, sellos_lado[1 - lado]
+
+            dist_actual, nodo_actual = heappop(cola)
+            if dist_actual > dist[nodo_actual]:
+                continue
+
+            explorados += 1
+
+            for pos in range(offsets[nodo_actual], offsets[nodo_actual + 1]):
+                vecino = destinos[pos]
+                distancia = dist_actual + pesos[pos]
+
+                if sellos[vecino] != sello or distancia < dist[vecino]:
+                    dist[vecino] = distancia
+                    padre[vecino] = nodo_actual
+                    sellos[vecino] = sello
+                    heappush(cola, (distancia, vecino))
+
+                if sellos_otro[vecino] == sello_otro:
+                    total = distancia + dist_otro[vecino]
+                    if total < mejor:
+                        mejor = total
+                        encuentro = vecino
+
+        if encuentro == -1:
+            return None, INFINITO, explorados
+
+        # Ida: s → encuentro; vuelta: encuentro → t
+        camino = self._reconstruir(espacios[0].padres, encuentro)
+        padres_vuelta = espacios[1].padres
+        nodo = padres_vuelta[encuentro]
+        while nodo != -1:
+            camino.append(nodo)
+            nodo = padres_vuelta[nodo]
+
+        return camino, mejor, explorados
+
+    def _compacto(self, s, t, pesos):
+        """Dijkstra sobre el grafo de intersecciones; la ruta se expande a
+        todos los nodos de paso al final"""
+        if s == t:
+            return [s], 0.0, 1
+        compacto = self.compactado()
+        _, pesos_arcos = compacto.pesos_para(pesos)
+        metas = compacto.extremos(t, pesos)
+
+        espacio, explorados = self.arbol_caminos(
+            None, pesos=pesos_arcos, semillas=compacto.extremos(s, pesos),
+            csr=(compacto.offsets, compacto.destinos), metas=metas)
+        costo, llegada = min((espacio.distancia(v) + resto, v) for v, resto in metas)
+
+        camino = None
+        if costo < INFINITO:
+            nucleos = self._reconstruir(espacio.padres, llegada)
+            camino = (compacto.tramo(s, nucleos[0], pesos)[:-1] +
+                      compacto.expandir(nucleos, pesos_arcos) +
+                      compacto.tramo(t, nucleos[-1], pesos)[-2::-1])
+
+        # Origen y destino en la misma cadena: puede convenir no salir de ella
+        directo = compacto.entre(s, t, pesos)
+        if directo is not None and directo[0] <= costo:
+            costo, camino = directo
+        if camino is None:
+            return None, INFINITO, explorados
+        return camino, costo, explorados
+
+    def compactado(self):
+        """Grafo compactado (se construye la primera vez)"""
+        if self.compacto is None:
+            self.compacto = GrafoCompacto.construir(self)
+        return self.compacto
+
+    def _ch(self, s, t, pesos):
+        """Consulta sobre la Contraction Hierarchy cargada en ``jerarquia``"""
+        if self.jerarquia is None:
+            raise ValueError("No hay Contraction Hierarchy cargada")
+        if pesos is not self.pesos:
+            raise ValueError("La Contraction Hierarchy solo cubre los pesos base")
+        return self.jerarquia.consultar(s, t)
+
+    def _reconstruir(self, padres, t):
+        """Camino (índices internos) desde la raíz de ``padres`` hasta ``t``"""
         camino = []
-        nodo = destino
-        while nodo is not None:
+        nodo = t
+        while nodo != -1:
             camino.append(nodo)
             nodo = padres[nodo]
-        
+
         camino.reverse()
-        
-        if camino[0] != origen:
-            return None
-        
+        return camino
+
+    def _armar_resultado(self, camino, costo):
+        """Respuesta de calcular_ruta a partir de índices internos"""
         # Calcular métricas
-        riesgo_total = sum(self.nodos[n]['riesgo'] for n in camino)
-        riesgo_promedio = riesgo_total / len(camino)
-        
+        riesgo_total = sum(self.riesgo[i] for i in camino)
+        riesgo_promedio = riesgo_total / len(camino) if camino else 0.0
+
         return {
-            'camino': camino,
-            'nodos': [self.nodos[n] for n in camino],
-            'distancia_total': distancias[destino],
+            'camino': [self.ids[i] for i in camino],
+            'nodos': [self.nodo(i) for i in camino],
+            'distancia_total': costo,
             'riesgo_promedio': riesgo_promedio
         }
 
@@ -98,10 +1067,10 @@ class GrafoDijkstra:
 if __name__ == "__main__":
     grafo = GrafoDijkstra()
     grafo.cargar_desde_csv()
-    
+
     # Prueba: Plaza de Armas (1) → Terminal (2)
     ruta = grafo.calcular_ruta(1, 2)
-    
+
     if ruta:
         print("\n✅ RUTA ENCONTRADA:")
         for i, nodo in enumerate(ruta['nodos'], 1):
@@ -109,4 +1078,4 @@ if __name__ == "__main__":
         print(f"\n  Distancia ponderada: {ruta['distancia_total']:.2f}")
         print(f"  Riesgo promedio: {ruta['riesgo_promedio']:.1f}/100")
     else:
-        print("❌ No se encontró ruta")
\ No newline at end of file
+        print("❌ No se encontró ruta")
@@ -0,0 +1,196 @@
+"""
+GEOMETRÍA DEL MAPA - JULIACA
+Consultas por rectángulo visible y nivel de zoom para dibujar el mapa.
+Las cadenas del grafo compactado se parten en tramos de riesgo constante
+(una polilínea por tramo, un solo color) y cada punto guarda la tolerancia
+hasta la que Douglas–Peucker lo conserva: simplificar para un zoom es
+solo filtrar puntos, sin recalcular nada por consulta.
+"""
+
+import math
+from array import array
+
+from indice_espacial import Rejilla
+
+INFINITO = float('inf')
+# Ancho (píxeles) en que se dibuja toda la ciudad en el zoom 0; cada nivel
+# de zoom duplica la escala
+PIXELES_REFERENCIA = 1024
+# Desde este zoom la tolerancia es despreciable (geometría completa)
+ZOOM_MAXIMO = 6
+# Niveles por encima del que corresponde al rectángulo pedido que se
+# aceptan: más detalle que eso no cabe en pantalla y solo agranda la respuesta
+ZOOM_EXTRA = 1
+# Separación mínima entre nodos dibujados, en píxeles
+PIXELES_POR_NODO = 6
+# Tramos más cortos que esto (en píxeles) se omiten fuera del zoom máximo
+PIXELES_MIN_TRAMO = 2
+# Los tramos pueden ser largos: celdas más grandes que las del índice de nodos
+CELDA_TRAMOS_KM = 0.5
+DECIMALES = 6  # ~0.1 m
+
+
+def _distancia_segmento(px, py, ax, ay, bx, by):
+    """Distancia del punto p al segmento a-b"""
+    dx, dy = bx - ax, by - ay
+    largo2 = dx * dx + dy * dy
+    if largo2 == 0:
+        return math.hypot(px - ax, py - ay)
+    t = min(1.0, max(0.0, ((px - ax) * dx + (py - ay) * dy) / largo2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def importancia_douglas_peucker(xs, ys):
+    """Tolerancia hasta la que Douglas–Peucker conserva cada punto.
+
+    Con tolerancia ``tol`` la simplificación es exactamente los puntos
+    con importancia > ``tol``: un punto nunca vale más que el que partió
+    su segmento, así que el filtro respeta la recursión original.
+    """
+    n = len(xs)
+    importancia = array('d', [0.0]) * n
+    importancia[0] = importancia[n - 1] = INFINITO
+    pila = [(0, n - 1, INFINITO)]
+    while pila:
+        a, b, tope = pila.pop()
+        if b - a < 2:
+            continue
+        lejos, j = -1.0, a + 1
+        for i in range(a + 1, b):
+            d = _distancia_segmento(xs[i], ys[i], xs[a], ys[a], xs[b], ys[b])
+            if d > lejos:
+                lejos, j = d, i
+        importancia[j] = valor = min(lejos, tope)
+        pila.append((a, j, valor))
+        pila.append((j, b, valor))
+    return importancia
+
+
+class GeometriaMapa(Rejilla):
+    """Tramos de calle indexados en una rejilla por su rectángulo envolvente.
+
+    El tramo ``t`` son los nodos ``tramo_nodos[tramo_offsets[t]:tramo_offsets[t+1]]``
+    con su importancia en el mismo rango de ``importancia``.
+    """
+
+    def __init__(self, grafo, compacto, indice_nodos, celda_km=CELDA_TRAMOS_KM):
+        super().__init__(grafo.lat, grafo.lon, celda_km)
+        self.grafo = grafo
+        self.nodos = indice_nodos
+        self.tramo_offsets = array('l', [0])
+        self.tramo_nodos = array('l')
+        self.tramo_riesgo = array('B')
+        self.tramo_largo = array('d')
+        self.importancia = array('d')
+        self.cajas = array('d')  # x1, y1, x2, y2 de cada tramo
+
+        adj_arista, arista_riesgo = grafo.adj_arista, grafo.arista_riesgo
+        for k in range(len(compacto.cadena_offsets) - 1):
+            nodos = compacto.nodos_cadena(k)
+            riesgos = [arista_riesgo[adj_arista[pos]] for pos in compacto.posiciones_cadena(k)]
+            inicio = 0
+            for j in range(1, len(riesgos) + 1):
+                if j == len(riesgos) or riesgos[j] != riesgos[inicio]:
+                    self._agregar(nodos[inicio:j + 1], riesgos[inicio])
+                    inicio = j
+
+        self._fijar_limites()
+        ancho = max(self.x) - min(self.x) if grafo.n else 0.0
+        alto = max(self.y) - min(self.y) if grafo.n else 0.0
+        self.extension = max(ancho, alto, self.celda)
+        print(f"✅ Geometría del mapa: {len(self.tramo_riesgo)} tramos, "
+              f"{len(self.tramo_nodos)} puntos")
+
+    def _agregar(self, nodos, riesgo):
+        t = len(self.tramo_riesgo)
+        xs = [self.x[v] for v in nodos]
+        ys = [self.y[v] for v in nodos]
+        self.tramo_nodos.extend(nodos)
+        self.tramo_offsets.append(len(self.tramo_nodos))
+        self.tramo_riesgo.append(riesgo)
+        self.tramo_largo.append(sum(math.hypot(xs[i + 1] - xs[i], ys[i + 1] - ys[i])
+                                    for i in range(len(xs) - 1)))
+        self.importancia.extend(importancia_douglas_peucker(xs, ys))
+        caja = (min(xs), min(ys), max(xs), max(ys))
+        self.cajas.extend(caja)
+
+        cx1, cy1 = self._celda(caja[0], caja[1])
+        cx2, cy2 = self._celda(caja[2], caja[3])
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self.celdas.setdefault((cx, cy), array('l')).append(t)
+
+    def tolerancia(self, zoom):
+        """Km por píxel en ``zoom``: lo que se puede simplificar sin que se note"""
+        return self.extension / PIXELES_REFERENCIA / 2 ** zoom
+
+    def zoom_para(self, x1, y1, x2, y2):
+        """Zoom en que el rectángulo ocupa PIXELES_REFERENCIA de ancho"""
+        lado = max(x2 - x1, y2 - y1, 1e-9)
+        return min(ZOOM_MAXIMO, max(0, math.floor(math.log2(self.extension / lado))))
+
+    def _vista(self, lat_min, lon_min, lat_max, lon_max, zoom):
+        """(rectángulo proyectado, zoom efectivo) de una consulta"""
+        rectangulo = self._rectangulo(lat_min, lon_min, lat_max, lon_max)
+        tope = min(ZOOM_MAXIMO, self.zoom_para(*rectangulo) + ZOOM_EXTRA)
+        zoom = tope - ZOOM_EXTRA if zoom is None else min(max(0, zoom), tope)
+        return rectangulo, zoom
+
+    def tramos_visibles(self, lat_min, lon_min, lat_max, lon_max, zoom=None):
+        """(zoom usado, [(riesgo, nodos conservados)]) de los tramos que tocan el rectángulo.
+
+        Sin ``zoom`` se usa el que corresponde al tamaño del rectángulo, y
+        nunca más de ZOOM_EXTRA niveles por encima: la respuesta queda
+        acotada por lo que cabe en pantalla, no por el tamaño del mapa.
+        """
+        (x1, y1, x2, y2), zoom = self._vista(lat_min, lon_min, lat_max, lon_max, zoom)
+        tolerancia = self.tolerancia(zoom) if zoom < ZOOM_MAXIMO else 0.0
+        cajas, offsets, importancia = self.cajas, self.tramo_offsets, self.importancia
+
+        vistos = set()
+        visibles = []
+        for celda in self._en_rectangulo(x1, y1, x2, y2):
+            for t in celda:
+                if t in vistos:
+                    continue
+                vistos.add(t)
+                if self.tramo_largo[t] < tolerancia * PIXELES_MIN_TRAMO:
+                    continue
+                if (cajas[4 * t] > x2 or cajas[4 * t + 2] < x1 or
+                        cajas[4 * t + 1] > y2 or cajas[4 * t + 3] < y1):
+                    continue
+                nodos = [self.tramo_nodos[j] for j in range(offsets[t], offsets[t + 1])
+                         if importancia[j] > tolerancia]
+                visibles.append((self.tramo_riesgo[t], nodos))
+        return zoom, visibles
+
+    def tramos(self, lat_min, lon_min, lat_max, lon_max, zoom=None):
+        """(zoom usado, [{'riesgo', 'puntos': [[lat, lon], ...]}]) listos para JSON"""
+        zoom, visibles = self.tramos_visibles(lat_min, lon_min, lat_max, lon_max, zoom)
+        lat, lon = self.grafo.lat, self.grafo.lon
+        return zoom, [{'riesgo': riesgo,
+                       'puntos': [[round(lat[v], DECIMALES), round(lon[v], DECIMALES)]
+                                  for v in nodos]}
+                      for riesgo, nodos in visibles]
+
+    def nodos_visibles(self, lat_min, lon_min, lat_max, lon_max, zoom=None):
+        """(zoom usado, índices de nodos en el rectángulo), a lo más uno cada
+        PIXELES_POR_NODO píxeles del zoom"""
+        (x1, y1, x2, y2), zoom = self._vista(lat_min, lon_min, lat_max, lon_max, zoom)
+        separacion = self.tolerancia(zoom) * PIXELES_POR_NODO if zoom < ZOOM_MAXIMO else 0.0
+        xs, ys = self.nodos.x, self.nodos.y
+
+        ocupadas = set()
+        visibles = []
+        for celda in self.nodos._en_rectangulo(x1, y1, x2, y2):
+            for i in celda:
+                x, y = xs[i], ys[i]
+                if not (x1 <= x <= x2 and y1 <= y <= y2):
+                    continue
+                if separacion:
+                    lugar = (math.floor(x / separacion), math.floor(y / separacion))
+                    if lugar in ocupadas:
+                        continue
+                    ocupadas.add(lugar)
+                visibles.append(i)
+        return zoom, visibles
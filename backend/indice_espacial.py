@@ -0,0 +1,195 @@
+"""
+ÍNDICE ESPACIAL - JULIACA
+Rejillas uniformes sobre las coordenadas del grafo. Las coordenadas se
+proyectan a km en un plano local (equirectangular, suficiente a escala de
+ciudad) y cada celda guarda los índices internos de los nodos o de las
+aristas que caen en ella.
+"""
+
+import heapq
+import math
+from array import array
+
+KM_POR_GRADO = math.pi * 6371 / 180
+# Lado de cada celda (km): unos pocos nodos por celda en el centro
+CELDA_KM = 0.1
+
+
+class Rejilla:
+    """Proyección local y celdas; las subclases deciden qué guardar"""
+
+    def __init__(self, lat, lon, celda_km=CELDA_KM):
+        self.celda = celda_km
+        self.lat0 = sum(lat) / len(lat) if len(lat) else 0.0
+        self.cos0 = math.cos(math.radians(self.lat0))
+        self.x = array('d', (self._x(valor) for valor in lon))
+        self.y = array('d', (self._y(valor) for valor in lat))
+        self.celdas = {}
+
+    def _x(self, lon):
+        return lon * KM_POR_GRADO * self.cos0
+
+    def _y(self, lat):
+        return lat * KM_POR_GRADO
+
+    def a_lat_lon(self, x, y):
+        """Inversa de la proyección"""
+        return y / KM_POR_GRADO, x / (KM_POR_GRADO * self.cos0)
+
+    def _celda(self, x, y):
+        return (math.floor(x / self.celda), math.floor(y / self.celda))
+
+    def _fijar_limites(self):
+        if self.celdas:
+            columnas = [cx for cx, _ in self.celdas]
+            filas = [cy for _, cy in self.celdas]
+            self.limites = (min(columnas), min(filas), max(columnas), max(filas))
+        else:
+            self.limites = (0, 0, -1, -1)
+
+    def _rectangulo(self, lat_min, lon_min, lat_max, lon_max):
+        """(x1, y1, x2, y2) proyectados del rectángulo, en cualquier orden de esquinas"""
+        x1, x2 = sorted((self._x(lon_min), self._x(lon_max)))
+        y1, y2 = sorted((self._y(lat_min), self._y(lat_max)))
+        return x1, y1, x2, y2
+
+    def _en_rectangulo(self, x1, y1, x2, y2):
+        """Contenido de las celdas ocupadas que tocan el rectángulo"""
+        cx1, cy1 = self._celda(x1, y1)
+        cx2, cy2 = self._celda(x2, y2)
+        cx_min, cy_min, cx_max, cy_max = self.limites
+        contenido = []
+        for cx in range(max(cx1, cx_min), min(cx2, cx_max) + 1):
+            for cy in range(max(cy1, cy_min), min(cy2, cy_max) + 1):
+                celda = self.celdas.get((cx, cy))
+                if celda is not None:
+                    contenido.append(celda)
+        return contenido
+
+    def _recorrer(self, x, y):
+        """Genera (anillo, celdas del anillo) desde la celda de (x, y) hacia afuera.
+
+        Todo lo que está en un anillo posterior a ``anillo`` queda a más
+        de anillo * celda del punto.
+        """
+        cx, cy = self._celda(x, y)
+        cx_min, cy_min, cx_max, cy_max = self.limites
+        # Antes de este anillo no hay celdas ocupadas (punto fuera de la
+        # ciudad) y más allá del último ya no queda ninguna
+        primero = max(0, cx_min - cx, cx - cx_max, cy_min - cy, cy - cy_max)
+        ultimo = max(cx - cx_min, cx_max - cx, cy - cy_min, cy_max - cy)
+        for anillo in range(primero, ultimo + 1):
+            yield anillo, [self.celdas[celda] for celda in self._anillo(cx, cy, anillo)
+                           if celda in self.celdas]
+
+    def _anillo(self, cx, cy, r):
+        """Celdas dentro de ``limites`` a distancia de Chebyshev exactamente ``r`` de (cx, cy).
+
+        Se recorta a los límites: lejos de la ciudad un anillo tiene
+        muchas más celdas que las que pueden estar ocupadas.
+        """
+        if r == 0:
+            yield (cx, cy)
+            return
+        cx_min, cy_min, cx_max, cy_max = self.limites
+        columnas = range(max(cx - r, cx_min), min(cx + r, cx_max) + 1)
+        for fila in (cy - r, cy + r):
+            if cy_min <= fila <= cy_max:
+                for columna in columnas:
+                    yield (columna, fila)
+        filas = range(max(cy - r + 1, cy_min), min(cy + r - 1, cy_max) + 1)
+        for columna in (cx - r, cx + r):
+            if cx_min <= columna <= cx_max:
+                for fila in filas:
+                    yield (columna, fila)
+
+
+class IndiceNodos(Rejilla):
+    """Vecinos más cercanos a un punto recorriendo anillos de celdas.
+
+    Cada consulta revisa solo las celdas alrededor del punto: el costo
+    depende de los nodos cercanos, no del total.
+    """
+
+    def __init__(self, lat, lon, celda_km=CELDA_KM):
+        super().__init__(lat, lon, celda_km)
+        for i in range(len(self.x)):
+            self.celdas.setdefault(self._celda(self.x[i], self.y[i]), array('l')).append(i)
+        self._fijar_limites()
+
+    def cercanos(self, lat, lon, k=1):
+        """Lista de (distancia_km, índice) de los ``k`` nodos más cercanos"""
+        x, y = self._x(lon), self._y(lat)
+        mejores = []  # heap de (-distancia, índice) con los k mejores
+
+        for anillo, celdas in self._recorrer(x, y):
+            for celda in celdas:
+                for i in celda:
+                    distancia = math.hypot(self.x[i] - x, self.y[i] - y)
+                    if len(mejores) < k:
+                        heapq.heappush(mejores, (-distancia, i))
+                    elif distancia < -mejores[0][0]:
+                        heapq.heapreplace(mejores, (-distancia, i))
+
+            if len(mejores) == k and -mejores[0][0] <= anillo * self.celda:
+                break
+
+        return sorted((-distancia, i) for distancia, i in mejores)
+
+
+class IndiceAristas(Rejilla):
+    """Segmento de calle más cercano a un punto.
+
+    Cada arista se registra en todas las celdas de su rectángulo
+    envolvente, así que al revisar los anillos alrededor del punto ningún
+    segmento más cercano puede quedar sin ver.
+    """
+
+    def __init__(self, lat, lon, arista_u, arista_v, celda_km=CELDA_KM):
+        super().__init__(lat, lon, celda_km)
+        self.arista_u = arista_u
+        self.arista_v = arista_v
+        for e in range(len(arista_u)):
+            u, v = arista_u[e], arista_v[e]
+            cx1, cy1 = self._celda(min(self.x[u], self.x[v]), min(self.y[u], self.y[v]))
+            cx2, cy2 = self._celda(max(self.x[u], self.x[v]), max(self.y[u], self.y[v]))
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    self.celdas.setdefault((cx, cy), array('l')).append(e)
+        self._fijar_limites()
+
+    def proyectar(self, e, x, y):
+        """(distancia_km, fracción desde u, x, y) del punto más cercano de ``e``"""
+        u, v = self.arista_u[e], self.arista_v[e]
+        ax, ay = self.x[u], self.y[u]
+        dx, dy = self.x[v] - ax, self.y[v] - ay
+        largo2 = dx * dx + dy * dy
+        fraccion = 0.0
+        if largo2 > 0:
+            fraccion = min(1.0, max(0.0, ((x - ax) * dx + (y - ay) * dy) / largo2))
+        px, py = ax + fraccion * dx, ay + fraccion * dy
+        return math.hypot(px - x, py - y), fraccion, px, py
+
+    def cercana(self, lat, lon):
+        """(distancia_km, arista, fracción desde u, lat, lon proyectados) o None"""
+        x, y = self._x(lon), self._y(lat)
+        mejor = None
+        vistas = set()
+
+        for anillo, celdas in self._recorrer(x, y):
+            for celda in celdas:
+                for e in celda:
+                    if e in vistas:
+                        continue
+                    vistas.add(e)
+                    proyeccion = self.proyectar(e, x, y)
+                    if mejor is None or proyeccion[0] < mejor[1][0]:
+                        mejor = (e, proyeccion)
+
+            if mejor is not None and mejor[1][0] <= anillo * self.celda:
+                break
+
+        if mejor is None:
+            return None
+        e, (distancia, fraccion, px, py) = mejor
+        return (distancia, e, fraccion) + self.a_lat_lon(px, py)
@@ -0,0 +1,150 @@
+"""
+INSTANTÁNEA BINARIA DEL GRAFO - JULIACA
+Guarda el grafo ya armado (CSR, coordenadas, riesgo y nombres internados)
+en un archivo binario versionado. La API lo abre con mmap: arrancar no
+lee CSV ni arma estructuras, y varios procesos que abren el mismo archivo
+comparten las mismas páginas físicas (el sistema las carga una vez).
+"""
+
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections.abc import Sequence
+
+from dijkstra import GrafoDijkstra
+
+RUTA_INSTANTANEA = 'data/grafo_juliaca.bin'
+FUENTES = ('data/nodos_juliaca.csv', 'data/aristas_juliaca.csv')
+MAGIA = b'GRJ1'
+FORMATO = 1  # subir si cambia el contenido o el orden de las secciones
+ENCABEZADO = struct.Struct('<4sIIqqI')  # magia, formato, huella, n, m, secciones
+SECCION = struct.Struct('<32s1sQQ')     # nombre, tipo, desplazamiento, cantidad
+ALINEACION = 64
+
+# Arreglos del grafo y su tipo en disco (los enteros en 'q', el mismo
+# ancho fijo con que GrafoDijkstra.huella los toma en cualquier plataforma)
+ARREGLOS = (
+    ('ids', 'q'), ('lat', 'd'), ('lon', 'd'), ('riesgo', 'B'),
+    ('arista_u', 'q'), ('arista_v', 'q'), ('arista_dist', 'd'),
+    ('arista_riesgo', 'B'), ('arista_calle', 'i'),
+    ('offsets', 'q'), ('destinos', 'q'), ('adj_arista', 'q'),
+    ('distancia_semi', 'd'), ('riesgo_semi', 'B'), ('pesos', 'd'),
+    ('componente', 'q'), ('tamanos_componentes', 'q'),
+)
+
+
+class TablaNombres(Sequence):
+    """Nombres de los nodos: índices en disco sobre una tabla de nombres únicos"""
+
+    def __init__(self, indices, tabla):
+        self.indices = indices
+        self.tabla = tabla
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.tabla[j] for j in self.indices[i]]
+        return self.tabla[self.indices[i]]
+
+    def __len__(self):
+        return len(self.indices)
+
+
+def _textos(lista):
+    """Tabla de textos a bytes (separados por NUL)"""
+    return array('B', '\0'.join(lista).encode('utf-8'))
+
+
+def guardar(grafo, ruta=RUTA_INSTANTANEA):
+    """Escribe la instantánea de ``grafo`` en ``ruta``"""
+    posiciones = {}
+    indices_nombres = array('i', (posiciones.setdefault(nombre, len(posiciones))
+                                  for nombre in grafo.nombres))
+    tabla = list(posiciones)
+
+    secciones = [(nombre, tipo, array(tipo, getattr(grafo, nombre))) for nombre, tipo in ARREGLOS]
+    secciones.append(('nombres', 'i', indices_nombres))
+    secciones.append(('tabla_nombres', 'B', _textos(tabla)))
+    secciones.append(('calles', 'B', _textos(grafo.calles)))
+
+    desplazamiento = ENCABEZADO.size + SECCION.size * len(secciones)
+    directorio = []
+    for nombre, tipo, datos in secciones:
+        desplazamiento = -(-desplazamiento // ALINEACION) * ALINEACION
+        directorio.append((nombre, tipo, desplazamiento, len(datos)))
+        desplazamiento += len(datos) * datos.itemsize
+
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(ENCABEZADO.pack(MAGIA, FORMATO, grafo.huella(), grafo.n, grafo.m, len(secciones)))
+        for nombre, tipo, inicio, cantidad in directorio:
+            f.write(SECCION.pack(nombre.encode(), tipo.encode(), inicio, cantidad))
+        for (_, _, datos), (_, _, inicio, _) in zip(secciones, directorio):
+            f.write(b'\0' * (inicio - f.tell()))
+            datos.tofile(f)
+    # Reemplazo atómico: quien tenga abierta la versión anterior la conserva
+    os.replace(temporal, ruta)
+    print(f"✅ Instantánea guardada en {ruta} ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+
+
+def vigente(ruta=RUTA_INSTANTANEA, fuentes=FUENTES):
+    """True si la instantánea existe y es más nueva que los CSV de origen"""
+    if not os.path.exists(ruta):
+        return False
+    modificada = os.path.getmtime(ruta)
+    return all(not os.path.exists(fuente) or os.path.getmtime(fuente) <= modificada
+               for fuente in fuentes)
+
+
+def cargar(ruta=RUTA_INSTANTANEA):
+    """GrafoDijkstra con sus arreglos mapeados desde ``ruta`` (o None si el
+    formato no coincide). Los arreglos son memoryview de solo lectura."""
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    vista = memoryview(mapa)
+
+    magia, formato, huella, n, m, num_secciones = ENCABEZADO.unpack_from(vista)
+    if magia != MAGIA or formato != FORMATO:
+        print(f"⚠️  {ruta} tiene otro formato (se esperaba {MAGIA.decode()} v{FORMATO})")
+        return None
+
+    secciones = {}
+    for k in range(num_secciones):
+        nombre, tipo, desplazamiento, cantidad = SECCION.unpack_from(
+            vista, ENCABEZADO.size + k * SECCION.size)
+        tipo = tipo.decode()
+        largo = cantidad * struct.calcsize(tipo)
+        secciones[nombre.rstrip(b'\0').decode()] = vista[desplazamiento:desplazamiento + largo].cast(tipo)
+
+    grafo = GrafoDijkstra()
+    grafo.n, grafo.m = n, m
+    for nombre, _ in ARREGLOS:
+        setattr(grafo, nombre, secciones[nombre])
+    tabla = bytes(secciones['tabla_nombres']).decode('utf-8').split('\0')
+    grafo.nombres = TablaNombres(secciones['nombres'], tabla)
+    grafo.calles = bytes(secciones['calles']).decode('utf-8').split('\0')
+
+    if any(nodo_id != i for i, nodo_id in enumerate(grafo.ids)):
+        grafo._indice = {nodo_id: i for i, nodo_id in enumerate(grafo.ids)}
+    grafo._reiniciar_derivados()
+    grafo._nueva_version()
+
+    if grafo.huella() != huella:
+        print(f"⚠️  {ruta} está dañado (la huella no coincide)")
+        return None
+
+    print(f"✅ Grafo mapeado desde {ruta}: {n} nodos, {m} aristas "
+          f"en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return grafo
+
+
+if __name__ == "__main__":
+    print("="*60)
+    print("   INSTANTÁNEA BINARIA DEL GRAFO")
+    print("="*60 + "\n")
+
+    grafo = GrafoDijkstra()
+    grafo.cargar_desde_csv(*FUENTES)
+    guardar(grafo)
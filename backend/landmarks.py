@@ -0,0 +1,130 @@
+"""
+LANDMARKS (ALT) - JULIACA
+Elige K nodos de referencia alejados entre sí y precalcula la distancia
+ponderada (distancia + riesgo*0.1) de cada uno a todos los nodos. Con esas
+tablas la desigualdad triangular da cotas inferiores ajustadas para A*.
+"""
+
+import struct
+import time
+from array import array
+
+from dijkstra import GrafoDijkstra, INFINITO
+
+RUTA_LANDMARKS = 'data/landmarks_juliaca.bin'
+MAGIA = b'LMJ1'
+ENCABEZADO = struct.Struct('<4sIII')  # magia, huella, n, k
+
+# Cantidad de landmarks y cuántos se usan en cada consulta
+K_LANDMARKS = 16
+LANDMARKS_ACTIVOS = 4
+
+
+class Landmarks:
+    """Distancias de K landmarks a todos los nodos.
+
+    ``distancias[k * n + v]`` es el costo del landmark ``k`` al nodo ``v``
+    (infinito si están en componentes distintas). Como el grafo es no
+    dirigido, |d(L, t) - d(L, v)| es cota inferior de d(v, t).
+    """
+
+    def __init__(self, nodos, distancias, n, huella=0):
+        self.nodos = nodos
+        self.distancias = distancias
+        self.n = n
+        self.huella = huella
+
+    @classmethod
+    def construir(cls, grafo, k=K_LANDMARKS):
+        """Selección "farthest": cada landmark nuevo es el nodo más lejano
+        (en costo ponderado) de los ya elegidos."""
+        n = grafo.n
+        inicio = time.time()
+
+        # Se parte del nodo de mayor grado para caer en la componente principal
+        grados = [grafo.offsets[i + 1] - grafo.offsets[i] for i in range(n)]
+        origen = max(range(n), key=grados.__getitem__)
+        espacio, _ = grafo.arbol_caminos(origen)
+        cercania = espacio.exportar_distancias()
+
+        nodos = array('l')
+        distancias = array('d')
+        for _ in range(k):
+            # Nodo alcanzable más lejano de todos los landmarks ya elegidos
+            candidato = max((v for v in range(n) if cercania[v] < INFINITO),
+                            key=cercania.__getitem__)
+            if nodos and cercania[candidato] == 0.0:
+                break
+
+            espacio, _ = grafo.arbol_caminos(candidato)
+            fila = espacio.exportar_distancias()
+            nodos.append(candidato)
+            distancias.extend(fila)
+            cercania = array('d', map(min, cercania, fila))
+
+        print(f"✅ {len(nodos)} landmarks precalculados en {time.time() - inicio:.1f}s")
+        return cls(nodos, distancias, n, grafo.huella())
+
+    def heuristica(self, s, t):
+        """Cota inferior h(v) hacia ``t`` con los landmarks más útiles para s→t"""
+        n, distancias = self.n, self.distancias
+        candidatos = []
+        for k in range(len(self.nodos)):
+            ds, dt = distancias[k * n + s], distancias[k * n + t]
+            if ds < INFINITO and dt < INFINITO:
+                candidatos.append((abs(ds - dt), k))
+        candidatos.sort(reverse=True)
+        filas = [(k * n, distancias[k * n + t]) for _, k in candidatos[:LANDMARKS_ACTIVOS]]
+
+        def cota(v):
+            mejor = 0.0
+            for base, dt in filas:
+                diferencia = distancias[base + v] - dt
+                if diferencia < 0:
+                    diferencia = -diferencia
+                if diferencia > mejor:
+                    mejor = diferencia
+            return mejor
+
+        return cota
+
+    def guardar(self, ruta=RUTA_LANDMARKS):
+        """Escribe las tablas en formato binario"""
+        with open(ruta, 'wb') as f:
+            f.write(ENCABEZADO.pack(MAGIA, self.huella, self.n, len(self.nodos)))
+            array('i', self.nodos).tofile(f)
+            self.distancias.tofile(f)
+        print(f"✅ Landmarks guardados en {ruta}")
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_LANDMARKS, grafo=None):
+        """Lee las tablas; devuelve None si no corresponden a ``grafo``"""
+        with open(ruta, 'rb') as f:
+            magia, huella, n, k = ENCABEZADO.unpack(f.read(ENCABEZADO.size))
+            if magia != MAGIA:
+                raise ValueError(f"{ruta} no es un archivo de landmarks")
+            if grafo is not None and (huella != grafo.huella() or n != grafo.n):
+                print(f"⚠️  {ruta} no corresponde al grafo cargado")
+                return None
+
+            nodos = array('i')
+            nodos.fromfile(f, k)
+            distancias = array('d')
+            distancias.fromfile(f, k * n)
+
+        return cls(array('l', nodos), distancias, n, huella)
+
+
+if __name__ == "__main__":
+    print("="*60)
+    print("   PRECÁLCULO DE LANDMARKS (ALT)")
+    print("="*60 + "\n")
+
+    grafo = GrafoDijkstra()
+    grafo.cargar_desde_csv()
+
+    landmarks = Landmarks.construir(grafo)
+    landmarks.guardar()
+
+    for k, nodo in enumerate(landmarks.nodos, 1):
+        print(f"   {k}. {grafo.nombres[nodo]}")
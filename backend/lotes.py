@@ -0,0 +1,149 @@
+"""
+RUTAS POR LOTES - JULIACA
+Resuelve muchos pares origen/destino agrupándolos por origen: un solo
+árbol de caminos por origen sirve a todos sus destinos. Los lotes
+grandes y las matrices de costos se pueden repartir en un pool de
+procesos.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import instantanea
+from dijkstra import GrafoDijkstra
+
+MAX_PARES_LOTE = 20000
+MAX_PUNTOS_MATRIZ = 200
+# Con menos orígenes distintos no compensa repartir entre procesos
+MIN_ORIGENES_PARALELO = 8
+
+# El servidor tiene hilos (peticiones, recarga) y un fork con hilos puede
+# dejar locks tomados en el hijo: los procesos del pool salen de un
+# forkserver sin hilos y cargan el grafo desde la instantánea (mmap)
+CONTEXTO_POOL = 'forkserver'
+
+# En cada proceso del pool, el grafo que cargó _iniciar_proceso
+_grafo_pool = None
+# En el proceso principal, el pool y la versión del grafo que atiende
+_pool = None
+_version_pool = None
+_lock_pool = threading.Lock()
+
+
+def agrupar_por_origen(pares):
+    """OrderedDict {origen: [destinos en el orden pedido]}"""
+    grupos = OrderedDict()
+    for origen, destino in pares:
+        grupos.setdefault(origen, []).append(destino)
+    return grupos
+
+
+def _resolver_grupo(origen, destinos, grafo=None):
+    """Lista de (origen, destino, resultado) para un origen"""
+    grafo = grafo if grafo is not None else _grafo_pool
+    rutas = grafo.calcular_rutas_desde(origen, destinos)
+    return [(origen, destino, rutas[destino]) for destino in destinos]
+
+
+def _iniciar_proceso(huella):
+    """Inicializador de cada proceso del pool: carga el grafo de los archivos.
+
+    Basta el grafo base: los lotes y las matrices no usan hora, perfil,
+    jerarquía ni landmarks.
+    """
+    global _grafo_pool
+    grafo = instantanea.cargar() if instantanea.vigente() else None
+    if grafo is None:
+        grafo = GrafoDijkstra()
+        grafo.cargar_desde_csv()
+    if grafo.huella() != huella:
+        raise RuntimeError("Los archivos ya no corresponden al grafo publicado")
+    _grafo_pool = grafo
+
+
+def _enviar(grafo, funcion, tareas):
+    """Futuros de ``funcion(*argumentos)`` para cada tarea en el pool de ``grafo``.
+
+    Se envían con el lock tomado: cerrar_pool no puede cerrar el pool a
+    mitad de un envío. Lo ya enviado a un pool cerrado termina igual.
+    """
+    global _pool, _version_pool
+    with _lock_pool:
+        if _pool is None or _version_pool != grafo.version:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _version_pool = grafo.version
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context(CONTEXTO_POOL),
+                initializer=_iniciar_proceso, initargs=(grafo.huella(),))
+        return [_pool.submit(funcion, *argumentos) for argumentos in tareas]
+
+
+def cerrar_pool(esperar=False):
+    """Cierra el pool del grafo anterior (al publicar uno nuevo, o al salir con ``esperar``)"""
+    global _pool, _version_pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=esperar)
+        _pool = _version_pool = None
+
+
+def resolver_lote(grafo, pares, paralelo=False):
+    """Genera (origen, destino, resultado) a medida que se resuelven.
+
+    Con ``paralelo`` y suficientes orígenes, cada grupo va a un proceso
+    del pool y los resultados salen en el orden en que terminan.
+    """
+    grupos = agrupar_por_origen(pares)
+
+    if not paralelo or len(grupos) < MIN_ORIGENES_PARALELO:
+        for origen, destinos in grupos.items():
+            yield from _resolver_grupo(origen, destinos, grafo)
+        return
+
+    futuros = _enviar(grafo, _resolver_grupo, grupos.items())
+    for futuro in as_completed(futuros):
+        yield from futuro.result()
+
+
+def _fila_matriz(i, puntos, grafo=None):
+    """Métricas del punto ``i`` a los puntos siguientes (el grafo es simétrico)"""
+    grafo = grafo if grafo is not None else _grafo_pool
+    return i, grafo.metricas_desde(puntos[i], puntos[i + 1:])
+
+
+def calcular_matriz(grafo, puntos, paralelo=False):
+    """Matrices densas de costo ponderado, km y riesgo promedio.
+
+    Como las aristas son bidireccionales solo se busca el triángulo
+    superior: la búsqueda desde el punto i se detiene al asentar los
+    puntos i+1..n-1. Los pares sin ruta quedan en None.
+    """
+    n = len(puntos)
+    costo = [[None] * n for _ in range(n)]
+    km = [[None] * n for _ in range(n)]
+    riesgo = [[None] * n for _ in range(n)]
+
+    for i, punto in enumerate(puntos):
+        indice = grafo.indice_de(punto)
+        if indice is not None:
+            costo[i][i], km[i][i], riesgo[i][i] = 0.0, 0.0, float(grafo.riesgo[indice])
+
+    if paralelo and n >= MIN_ORIGENES_PARALELO:
+        futuros = _enviar(grafo, _fila_matriz, ((i, puntos) for i in range(n - 1)))
+        filas = (futuro.result() for futuro in as_completed(futuros))
+    else:
+        filas = (_fila_matriz(i, puntos, grafo) for i in range(n - 1))
+
+    for i, metricas in filas:
+        for j in range(i + 1, n):
+            valor = metricas[puntos[j]]
+            if valor is not None:
+                costo[i][j], km[i][j], riesgo[i][j] = valor
+                costo[j][i], km[j][i], riesgo[j][i] = valor
+
+    return {'costo': costo, 'distancia_km': km, 'riesgo_promedio': riesgo}
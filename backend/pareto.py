@@ -0,0 +1,156 @@
+"""
+RUTAS PARETO - JULIACA
+Búsqueda bicriterio (km, riesgo acumulado) por asentamiento de etiquetas.
+En vez de mezclar distancia y riesgo en un solo peso devuelve todas las
+rutas no dominadas: ninguna es a la vez más corta y menos riesgosa que
+otra del frente.
+"""
+
+import heapq
+import time
+from array import array
+
+from dijkstra import INFINITO, PERFILES, PERFIL_PREDETERMINADO
+
+# Una etiqueta solo sobrevive si baja el riesgo del nodo al menos esta
+# fracción (dominancia épsilon): acota las etiquetas por nodo
+EPSILON_RIESGO = 0.01
+# Topes de etiquetas asentadas por nodo y creadas en total
+MAX_ETIQUETAS_NODO = 32
+MAX_ETIQUETAS = 200000
+TIEMPO_MAX_PARETO = 2.0
+
+
+def cotas_hacia(grafo, s, t, riesgos):
+    """Cotas inferiores exactas de km y de riesgo acumulado hasta ``t``, y
+    el camino de menor riesgo de ``s`` a ``t`` (None si no hay).
+
+    Son dos Dijkstra completos desde ``t`` (el grafo es no dirigido), uno
+    por criterio, en los dos espacios de búsqueda del hilo. El camino se
+    sigue en el árbol de riesgo antes de que otra búsqueda reuse el espacio.
+    """
+    espacio_km, _ = grafo.arbol_caminos(t, pesos=grafo.distancia_semi, lado=0)
+    espacio_riesgo, _ = grafo.arbol_caminos(t, pesos=riesgos, lado=1)
+    camino = None
+    if espacio_riesgo.distancia(s) < INFINITO:
+        camino = [s]
+        while camino[-1] != t:
+            camino.append(espacio_riesgo.padres[camino[-1]])
+    return espacio_km.exportar_distancias(), espacio_riesgo.exportar_distancias(), camino
+
+
+def frente_pareto(grafo, origen, destino, hora=None, tiempo_max=TIEMPO_MAX_PARETO):
+    """Rutas Pareto-óptimas de ``origen`` a ``destino`` ordenadas por km.
+
+    Las etiquetas (km, riesgo) salen de la cola en orden lexicográfico
+    de (km + cota de km, riesgo), como en A*; en un mismo nodo la cota es
+    la misma, así que una etiqueta está dominada allí si y solo si su
+    riesgo no baja del último asentado: la dominancia cuesta O(1). Además
+    se poda toda etiqueta que, sumando las cotas hasta el destino, ya
+    quede dominada por una ruta encontrada.
+    Para acotar las etiquetas se exige bajar el riesgo en EPSILON_RIESGO:
+    el frente es aproximado en esa fracción. Si algún nodo llega a
+    MAX_ETIQUETAS_NODO o se acaba el tiempo pueden faltar rutas, pero el
+    extremo de menor riesgo es siempre el exacto (árbol de cotas_hacia).
+    Devuelve (rutas, recortado): rutas es None si algún extremo no existe
+    y [] si no hay ruta; recortado indica que un tope cortó la búsqueda.
+    """
+    s = grafo.indice_de(origen)
+    t = grafo.indice_de(destino)
+    if s is None or t is None:
+        return None, False
+    if not grafo.conectados(s, t):
+        return [], False
+
+    riesgos = grafo.riesgo_semi if hora is None else grafo.riesgo_hora_semi[hora]
+    cota_km, cota_riesgo, camino_seguro = cotas_hacia(grafo, s, t, riesgos)
+    if camino_seguro is None:
+        return [], False
+
+    offsets, destinos, km_semi = grafo.offsets, grafo.destinos, grafo.distancia_semi
+    # Riesgo que debe mejorar una etiqueta en cada nodo y cuántas lleva
+    mejor_riesgo = array('d', [INFINITO]) * grafo.n
+    asentadas = array('B', [0]) * grafo.n
+
+    # Etiquetas: nodo, etiqueta padre (-1 en el origen)
+    nodos_etiqueta = array('l', [s])
+    padres_etiqueta = array('l', [-1])
+    cola = [(cota_km[s], 0, 0.0, 0)]  # (km + cota, riesgo, km, etiqueta)
+    heappop, heappush = heapq.heappop, heapq.heappush
+    frente = []  # (km, riesgo, etiqueta) en el destino
+    riesgo_frente = INFINITO
+    recortado = False
+    inicio = time.perf_counter()
+
+    while cola:
+        if len(nodos_etiqueta) >= MAX_ETIQUETAS:
+            recortado = True
+            break
+        _, riesgo, km, etiqueta = heappop(cola)
+        nodo = nodos_etiqueta[etiqueta]
+
+        if riesgo >= mejor_riesgo[nodo] or riesgo + cota_riesgo[nodo] >= riesgo_frente:
+            continue
+        if nodo != t:
+            # El destino no se cuenta: puede asentar todo el frente
+            if asentadas[nodo] >= MAX_ETIQUETAS_NODO:
+                recortado = True
+                continue
+            asentadas[nodo] += 1
+        mejor_riesgo[nodo] = riesgo * (1 - EPSILON_RIESGO)
+
+        if nodo == t:
+            frente.append((km, riesgo, etiqueta))
+            riesgo_frente = mejor_riesgo[t]
+            if riesgo == cota_riesgo[s]:
+                break  # ya se alcanzó el menor riesgo posible
+            continue
+
+        if time.perf_counter() - inicio > tiempo_max:
+            recortado = True
+            break
+
+        for pos in range(offsets[nodo], offsets[nodo + 1]):
+            vecino = destinos[pos]
+            nuevo_riesgo = riesgo + riesgos[pos]
+            if nuevo_riesgo >= mejor_riesgo[vecino] or nuevo_riesgo + cota_riesgo[vecino] >= riesgo_frente:
+                continue
+            nodos_etiqueta.append(vecino)
+            padres_etiqueta.append(etiqueta)
+            nuevo_km = km + km_semi[pos]
+            heappush(cola, (nuevo_km + cota_km[vecino], nuevo_riesgo, nuevo_km,
+                            len(nodos_etiqueta) - 1))
+
+    caminos = []  # (km, riesgo, camino)
+    for km, riesgo, etiqueta in frente:
+        camino = []
+        while etiqueta != -1:
+            camino.append(nodos_etiqueta[etiqueta])
+            etiqueta = padres_etiqueta[etiqueta]
+        camino.reverse()
+        caminos.append((km, riesgo, camino))
+
+    # Si los topes dejaron el frente sin su extremo de menor riesgo, se
+    # agrega el exacto
+    if not caminos or caminos[-1][1] > cota_riesgo[s] * (1 + 1e-9):
+        posiciones = grafo._posiciones_camino(camino_seguro, riesgos)
+        km = sum(km_semi[pos] for pos in posiciones)
+        riesgo = sum(riesgos[pos] for pos in posiciones)
+        caminos.append((km, riesgo, camino_seguro))
+
+    # Se quitan las rutas dominadas: las que el extremo exacto supera y los
+    # empates de km (por redondeo de las sumas) con más riesgo
+    caminos.sort(key=lambda c: (c[0], c[1]))
+    no_dominados = []
+    for camino in caminos:
+        if not no_dominados or camino[1] < no_dominados[-1][1]:
+            no_dominados.append(camino)
+
+    a, b = PERFILES[PERFIL_PREDETERMINADO]
+    rutas = []
+    for km, riesgo, camino in no_dominados:
+        resultado = grafo._armar_resultado(camino, a * km + b * riesgo)
+        resultado['distancia_km'] = km
+        resultado['riesgo_acumulado'] = riesgo
+        rutas.append(resultado)
+    return rutas, recortado
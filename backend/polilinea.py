@@ -0,0 +1,52 @@
+"""
+POLILÍNEA CODIFICADA - JULIACA
+Algoritmo de polilíneas codificadas de Google: cada coordenada se guarda
+como diferencia con la anterior, en enteros de 1e-5 grados (~1 m),
+escritos en bloques de 5 bits como caracteres ASCII. Lo leen directamente
+Leaflet (plugin polyline), Google Maps, OSRM y la mayoría de librerías.
+"""
+
+PRECISION = 5
+
+
+def _valor(delta, salida):
+    delta = ~(delta << 1) if delta < 0 else delta << 1
+    while delta >= 0x20:
+        salida.append(chr((0x20 | (delta & 0x1f)) + 63))
+        delta >>= 5
+    salida.append(chr(delta + 63))
+
+
+def codificar(puntos, precision=PRECISION):
+    """Texto de la polilínea de ``puntos`` [(lat, lon), ...]"""
+    factor = 10 ** precision
+    salida = []
+    lat_anterior = lon_anterior = 0
+    for lat, lon in puntos:
+        lat_entero, lon_entero = round(lat * factor), round(lon * factor)
+        _valor(lat_entero - lat_anterior, salida)
+        _valor(lon_entero - lon_anterior, salida)
+        lat_anterior, lon_anterior = lat_entero, lon_entero
+    return ''.join(salida)
+
+
+def decodificar(texto, precision=PRECISION):
+    """Lista de (lat, lon) de una polilínea codificada"""
+    factor = 10 ** precision
+    valores = []
+    actual = desplazamiento = 0
+    for caracter in texto:
+        bloque = ord(caracter) - 63
+        actual |= (bloque & 0x1f) << desplazamiento
+        desplazamiento += 5
+        if bloque < 0x20:
+            valores.append(~(actual >> 1) if actual & 1 else actual >> 1)
+            actual = desplazamiento = 0
+
+    puntos = []
+    lat = lon = 0
+    for i in range(0, len(valores) - 1, 2):
+        lat += valores[i]
+        lon += valores[i + 1]
+        puntos.append((lat / factor, lon / factor))
+    return puntos
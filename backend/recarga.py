@@ -0,0 +1,98 @@
+"""
+RECARGA EN CALIENTE - JULIACA
+Cuando cambian los archivos de datos (CSV regenerados con procesar_wkt.py,
+una instantánea nueva, la jerarquía, los landmarks o los incidentes) se
+arma un GrafoDijkstra nuevo mientras el vigente sigue atendiendo, y
+después se publica con una sola asignación. Cada petición toma el grafo
+una vez al entrar: las que están en curso terminan con el anterior y las
+nuevas usan el nuevo. El anterior se libera cuando nadie lo referencia.
+"""
+
+import os
+import threading
+import time
+
+# Cada cuánto se revisan los archivos (segundos). Un cambio se recarga
+# cuando los archivos pasan este tiempo sin volver a cambiar, para no leer
+# un CSV a medio escribir.
+INTERVALO_REVISION = 5
+
+
+class RecargaGrafo:
+    """Grafo vigente y su reemplazo cuando cambian los archivos de origen"""
+
+    def __init__(self, construir, fuentes, al_publicar=None):
+        self.construir = construir      # () -> grafo listo para atender
+        self.fuentes = tuple(fuentes)
+        self.al_publicar = al_publicar  # (grafo nuevo) -> None, tras publicarlo
+        self.recargas = 0
+        self._lock = threading.Lock()
+        self._pendiente = None  # (firma, desde cuándo) de un cambio sin recargar
+        self._firma = self.firma()
+        self.actual = construir()
+
+    def firma(self):
+        """(mtime, tamaño) de cada fuente, None si no existe"""
+        firma = []
+        for ruta in self.fuentes:
+            try:
+                estado = os.stat(ruta)
+            except FileNotFoundError:
+                firma.append(None)
+            else:
+                firma.append((estado.st_mtime_ns, estado.st_size))
+        return tuple(firma)
+
+    def recargar(self, forzar=False):
+        """Arma el grafo nuevo y lo publica; True si se publicó uno"""
+        with self._lock:
+            firma = self.firma()
+            if firma == self._firma and not forzar:
+                return False
+            inicio = time.perf_counter()
+            print("🔁 Cambiaron los datos: armando el grafo nuevo...")
+            try:
+                nuevo = self.construir()
+            except Exception as e:
+                # Se sigue con el grafo vigente hasta que los archivos vuelvan a cambiar
+                self._firma = firma
+                print(f"❌ La recarga falló, se mantiene el grafo anterior: {e}")
+                return False
+
+            self._firma = firma
+            self._pendiente = None
+            self.actual = nuevo
+            self.recargas += 1
+            if self.al_publicar is not None:
+                self.al_publicar(nuevo)
+            print(f"✅ Grafo nuevo publicado ({nuevo.version}) "
+                  f"en {time.perf_counter() - inicio:.1f} s")
+            return True
+
+    def revisar(self, espera=INTERVALO_REVISION):
+        """Recarga si las fuentes cambiaron y llevan ``espera`` segundos quietas.
+
+        No bloquea: se llama periódicamente (ver vigilar y servidor.py).
+        """
+        firma = self.firma()
+        if firma == self._firma:
+            self._pendiente = None
+            return False
+        ahora = time.monotonic()
+        if self._pendiente is None or self._pendiente[0] != firma:
+            self._pendiente = (firma, ahora)
+            return False
+        if ahora - self._pendiente[1] < espera:
+            return False
+        return self.recargar()
+
+    def vigilar(self, intervalo=INTERVALO_REVISION):
+        """Hilo que revisa las fuentes cada ``intervalo`` segundos"""
+        def bucle():
+            while True:
+                time.sleep(intervalo)
+                self.revisar(intervalo)
+
+        hilo = threading.Thread(target=bucle, name='recarga-grafo', daemon=True)
+        hilo.start()
+        return hilo
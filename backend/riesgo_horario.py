@@ -0,0 +1,101 @@
+"""
+RIESGO POR HORA - JULIACA
+Deriva del historial de incidentes (zona, hora, gravedad) un riesgo por
+arista para cada hora del día. Igual que MatrizDispersa en
+sistema_juliaca.py se agregan los incidentes por zona y hora; luego cada
+zona reparte su recargo horario a las calles cercanas a su centro.
+"""
+
+import bisect
+import csv
+import math
+from array import array
+from collections import defaultdict
+
+from dijkstra import HORAS_DIA
+
+RUTA_ZONAS = 'data/zonas_juliaca.csv'
+RUTA_INCIDENTES = 'data/incidentes_juliaca.csv'
+
+# Recargo máximo de riesgo (sobre 100) en la peor zona a la peor hora
+MAX_AJUSTE = 40
+# Radio de influencia de una zona sobre las calles (km)
+RADIO_ZONA_KM = 0.6
+# Peso de las horas vecinas al suavizar (los incidentes no son puntuales)
+PESO_HORA_VECINA = 0.5
+
+
+def cargar_zonas(ruta=RUTA_ZONAS):
+    """{zona_id: (lat, lon)}"""
+    zonas = {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            zonas[int(row['id'])] = (float(row['lat']), float(row['lon']))
+    return zonas
+
+
+def incidentes_por_zona_hora(ruta=RUTA_INCIDENTES):
+    """Gravedad acumulada por zona y hora: {zona: {hora: total}}"""
+    datos = defaultdict(lambda: defaultdict(int))
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if not row['zona_id'] or row['hora'] == '':
+                continue
+            hora = int(row['hora']) % HORAS_DIA
+            datos[int(row['zona_id'])][hora] += int(row['gravedad'] or 1)
+    return datos
+
+
+def ajustes_por_zona(incidentes):
+    """Recargo de riesgo (0..MAX_AJUSTE) por zona y hora, suavizado"""
+    suavizado = {}
+    for zona, por_hora in incidentes.items():
+        suavizado[zona] = [
+            por_hora.get(h, 0) + PESO_HORA_VECINA * (
+                por_hora.get((h - 1) % HORAS_DIA, 0) + por_hora.get((h + 1) % HORAS_DIA, 0))
+            for h in range(HORAS_DIA)
+        ]
+
+    maximo = max((max(valores) for valores in suavizado.values()), default=0)
+    if maximo == 0:
+        return {}
+    return {zona: [MAX_AJUSTE * v / maximo for v in valores]
+            for zona, valores in suavizado.items()}
+
+
+def riesgo_aristas_por_hora(grafo, ruta_zonas=RUTA_ZONAS, ruta_incidentes=RUTA_INCIDENTES):
+    """24 arreglos con el riesgo de cada arista de ``grafo`` a cada hora"""
+    zonas = cargar_zonas(ruta_zonas)
+    ajustes = ajustes_por_zona(incidentes_por_zona_hora(ruta_incidentes))
+    zonas = {z: coordenadas for z, coordenadas in zonas.items() if z in ajustes}
+
+    # Puntos medios de las aristas ordenados por latitud: cada zona revisa
+    # solo la franja de RADIO_ZONA_KM alrededor de su centro
+    km_por_grado = math.pi * 6371 / 180
+    medios = sorted(((grafo.lat[u] + grafo.lat[v]) / 2, (grafo.lon[u] + grafo.lon[v]) / 2, e)
+                    for e, (u, v) in enumerate(zip(grafo.arista_u, grafo.arista_v)))
+    latitudes = [lat for lat, _, _ in medios]
+    franja = RADIO_ZONA_KM / km_por_grado
+
+    # Influencia (0..1) de cada zona sobre las aristas cercanas a su centro
+    influencias = defaultdict(list)  # arista -> [(zona, factor)]
+    for zona, (lat_z, lon_z) in zonas.items():
+        desde = bisect.bisect_left(latitudes, lat_z - franja)
+        hasta = bisect.bisect_right(latitudes, lat_z + franja)
+        for lat, lon, e in medios[desde:hasta]:
+            dy = (lat - lat_z) * km_por_grado
+            dx = (lon - lon_z) * km_por_grado * math.cos(math.radians(lat_z))
+            distancia = math.hypot(dx, dy)
+            if distancia < RADIO_ZONA_KM:
+                influencias[e].append((zona, 1 - distancia / RADIO_ZONA_KM))
+
+    riesgo_por_hora = []
+    for hora in range(HORAS_DIA):
+        riesgos = array('B', grafo.arista_riesgo)
+        for e, zonas_cercanas in influencias.items():
+            recargo = max(factor * ajustes[zona][hora] for zona, factor in zonas_cercanas)
+            riesgos[e] = max(riesgos[e], min(100, round(riesgos[e] + recargo)))
+        riesgo_por_hora.append(riesgos)
+
+    print(f"✅ Riesgo horario: {len(influencias)} aristas afectadas por {len(zonas)} zonas")
+    return riesgo_por_hora
@@ -0,0 +1,190 @@
+"""
+SERVIDOR MULTIPROCESO - JULIACA
+Modo de producción de la API: el proceso maestro carga el grafo una sola
+vez (importando api.py), abre el socket y hace fork de N trabajadores que
+atienden en ese mismo socket. Los hijos comparten el grafo del padre
+(copy-on-write, o las páginas de la instantánea mapeada), así que cada
+ruta corre en su propio proceso sin competir por el GIL.
+
+Señales del maestro:
+  SIGHUP           reinicio ordenado: arranca trabajadores nuevos y los
+                   viejos terminan la petición en curso antes de salir
+                   (si cambiaron los datos, antes arma el grafo nuevo)
+  SIGTERM, SIGINT  apagado ordenado
+
+El maestro también vigila los archivos de datos (ver recarga.py): cuando
+cambian arma el grafo nuevo mientras los trabajadores siguen atendiendo
+con el anterior y luego hace un reinicio ordenado, así los trabajadores
+nuevos nacen con el grafo nuevo ya cargado.
+
+Requiere fork (Linux/macOS). Uso:
+  python backend/servidor.py --trabajadores 4 --puerto 5000
+"""
+
+import argparse
+import os
+import signal
+import socket
+import time
+
+from werkzeug.serving import make_server
+
+from api import app, precalentar, recarga
+from lotes import cerrar_pool
+from recarga import INTERVALO_REVISION
+
+TRABAJADORES = os.cpu_count() or 1
+# Cada cuánto revisa un trabajador si debe terminar (segundos)
+ESPERA_PETICION = 1.0
+# Tiempo máximo para que los trabajadores viejos terminen
+TIEMPO_APAGADO = 30
+
+
+def atender(sock):
+    """Bucle de un trabajador: una petición a la vez hasta recibir SIGTERM"""
+    activo = True
+
+    def terminar(signum, frame):
+        nonlocal activo
+        activo = False
+
+    signal.signal(signal.SIGTERM, terminar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    servidor = make_server(*sock.getsockname()[:2], app, fd=sock.fileno())
+    servidor.timeout = ESPERA_PETICION
+    while activo:
+        servidor.handle_request()
+    # os._exit no corre los atexit: sin esto los procesos del pool de
+    # lotes.py quedarían esperando tareas para siempre
+    cerrar_pool(esperar=True)
+    os._exit(0)
+
+
+class Maestro:
+    """Crea, vigila y recicla los procesos trabajadores"""
+
+    def __init__(self, sock, trabajadores=TRABAJADORES):
+        self.sock = sock
+        self.trabajadores = trabajadores
+        self.hijos = set()
+        self.saliendo = set()  # trabajadores viejos terminando su petición
+        self.pendiente = None  # señal recibida, se atiende en el bucle
+
+    def _nuevo_trabajador(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                atender(self.sock)
+            finally:
+                os._exit(1)
+        self.hijos.add(pid)
+
+    def _detener(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _recoger(self):
+        """Recoge los hijos que terminaron; devuelve cuántos trabajadores murieron"""
+        muertos = 0
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.hijos:
+                self.hijos.discard(pid)
+                muertos += 1
+            self.saliendo.discard(pid)
+        return muertos
+
+    def reiniciar(self):
+        """Trabajadores nuevos primero; los viejos salen al terminar lo que atienden"""
+        recarga.recargar()
+        precalentar(recarga.actual)
+        viejos = set(self.hijos)
+        self.hijos.clear()
+        for _ in range(self.trabajadores):
+            self._nuevo_trabajador()
+        self.saliendo |= viejos
+        self._detener(viejos)
+        print(f"🔁 Reinicio: {len(self.hijos)} trabajadores nuevos, {len(viejos)} saliendo")
+
+    def apagar(self):
+        self._detener(self.hijos | self.saliendo)
+        limite = time.time() + TIEMPO_APAGADO
+        while (self.hijos or self.saliendo) and time.time() < limite:
+            self._recoger()
+            time.sleep(0.1)
+        for pid in self.hijos | self.saliendo:
+            os.kill(pid, signal.SIGKILL)
+        print("👋 Servidor detenido")
+
+    def ejecutar(self):
+        def anotar(signum, frame):
+            self.pendiente = signum
+
+        for senal in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(senal, anotar)
+
+        precalentar(recarga.actual)
+        for _ in range(self.trabajadores):
+            self._nuevo_trabajador()
+
+        # El grafo nuevo se arma aquí y no en un hilo: hacer fork con otro
+        # hilo a mitad de la carga podría dejar locks tomados en los hijos
+        proxima_revision = time.monotonic() + INTERVALO_REVISION
+        while True:
+            senal, self.pendiente = self.pendiente, None
+            if senal in (signal.SIGTERM, signal.SIGINT):
+                self.apagar()
+                return
+            if senal == signal.SIGHUP:
+                self.reiniciar()
+            elif time.monotonic() >= proxima_revision:
+                proxima_revision = time.monotonic() + INTERVALO_REVISION
+                if recarga.revisar():
+                    self.reiniciar()
+
+            # Un trabajador que murió sin que se lo pidieran se reemplaza
+            for _ in range(self._recoger()):
+                self._nuevo_trabajador()
+            time.sleep(0.2)
+
+
+def abrir_socket(host, puerto):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, puerto))
+    sock.listen(128)
+    # Todos los trabajadores despiertan con cada conexión y solo uno la
+    # acepta: a los demás accept() les da BlockingIOError, que handle_request
+    # descarta, en vez de quedarse bloqueados sin ver SIGTERM. Se marca el
+    # descriptor y no el objeto (setblocking(False) haría que handle_request
+    # use espera 0 y los trabajadores giren sin parar)
+    os.set_blocking(sock.fileno(), False)
+    sock.set_inheritable(True)
+    return sock
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='API de rutas seguras con varios procesos')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=5000)
+    parser.add_argument('--trabajadores', type=int,
+                        default=int(os.environ.get('TRABAJADORES', TRABAJADORES)))
+    args = parser.parse_args()
+
+    sock = abrir_socket(args.host, args.puerto)
+    print("="*50)
+    print(f"📡 Servidor en http://{args.host}:{args.puerto} "
+          f"con {args.trabajadores} trabajadores (maestro {os.getpid()})")
+    print("🔁 Reinicio ordenado: kill -HUP", os.getpid())
+    print("="*50 + "\n")
+    Maestro(sock, max(1, args.trabajadores)).ejecutar()
@@ -3,9 +3,8 @@ const API_URL = 'http://localhost:5000';
 // Variables globales
 let canvas, ctx;
 let nodos = {};
-let aristasCompletas = [];
 let nodosVisibles = [];
-let aristasVisibles = [];
+let tramosVisibles = { cantidad: 0 };  // ver leerTramos
 let rutaActual = [];
 
 // Vista/transformación
@@ -24,6 +23,10 @@ let minLat, maxLat, minLon, maxLon;
 // OPTIMIZACIÓN: Límites de viewport actual
 let viewportBounds = { minLat: 0, maxLat: 0, minLon: 0, maxLon: 0 };
 
+// Consulta de la vista al servidor (la última gana)
+let consultaVista = 0;
+let temporizadorVista = null;
+
 // Colores
 function getColorRiesgo(riesgo) {
     if (riesgo < 40) return '#2ecc71';
@@ -91,55 +94,88 @@ function calcularViewportBounds() {
     };
 }
 
-// NUEVO: Filtrar elementos visibles en el viewport
+// Pedir al servidor los elementos visibles en el viewport
 function filtrarElementosVisibles() {
+    if (minLat === undefined) return;  // todavía no cargan los nodos
     viewportBounds = calcularViewportBounds();
     
-    // Filtrar nodos visibles
-    nodosVisibles = [];
-    for (const id in nodos) {
-        const nodo = nodos[id];
-        if (nodo.lat >= viewportBounds.minLat && nodo.lat <= viewportBounds.maxLat &&
-            nodo.lon >= viewportBounds.minLon && nodo.lon <= viewportBounds.maxLon) {
-            nodosVisibles.push({ id, ...nodo });
-        }
+    // Esperar a que termine el zoom con la rueda antes de pedir
+    clearTimeout(temporizadorVista);
+    temporizadorVista = setTimeout(pedirVista, 150);
+}
+
+// Formato binario (ver backend/binario.py): encabezado de 32 bytes y
+// arreglos tipados que se leen sin copiar ni parsear
+function leerEncabezado(buffer) {
+    const vista = new DataView(buffer);
+    return {
+        zoom: vista.getUint16(6, true),
+        cantidad: vista.getUint32(8, true),
+        puntos: vista.getUint32(12, true),
+        lat0: vista.getFloat64(16, true),
+        lon0: vista.getFloat64(24, true)
+    };
+}
+
+// Tramo t: coordenadas (lat - lat0, lon - lon0) desde offsets[t] hasta offsets[t+1]
+function leerTramos(buffer) {
+    const tramos = leerEncabezado(buffer);
+    let pos = 32;
+    tramos.offsets = new Uint32Array(buffer, pos, tramos.cantidad + 1);
+    pos += 4 * (tramos.cantidad + 1);
+    tramos.coords = new Float32Array(buffer, pos, 2 * tramos.puntos);
+    pos += 8 * tramos.puntos;
+    tramos.riesgos = new Uint8Array(buffer, pos, tramos.cantidad);
+    return tramos;
+}
+
+// Mismo diseño que b'NODO': ids, coordenadas relativas y riesgo
+function leerNodosVisibles(buffer) {
+    const { cantidad, lat0, lon0 } = leerEncabezado(buffer);
+    const ids = new Uint32Array(buffer, 32, cantidad);
+    const coords = new Float32Array(buffer, 32 + 4 * cantidad, 2 * cantidad);
+    const riesgos = new Uint8Array(buffer, 32 + 12 * cantidad, cantidad);
+    
+    const visibles = new Array(cantidad);
+    for (let i = 0; i < cantidad; i++) {
+        visibles[i] = {
+            id: ids[i],
+            lat: lat0 + coords[2 * i],
+            lon: lon0 + coords[2 * i + 1],
+            riesgo: riesgos[i]
+        };
     }
+    return visibles;
+}
+
+// El servidor devuelve solo lo que cae en el viewport, simplificado para
+// el zoom: la respuesta no crece con el tamaño del mapa
+async function pedirVista() {
+    const consulta = ++consultaVista;
+    const b = viewportBounds;
+    const zoom = Math.max(0, Math.floor(Math.log2(escala)));
+    const params = `bbox=${b.minLat},${b.minLon},${b.maxLat},${b.maxLon}&zoom=${zoom}&formato=binario`;
     
-    // Filtrar aristas visibles (ambos extremos en viewport)
-    aristasVisibles = [];
-    for (const arista of aristasCompletas) {
-        const origenVisible = 
-            arista.origen.lat >= viewportBounds.minLat && 
-            arista.origen.lat <= viewportBounds.maxLat &&
-            arista.origen.lon >= viewportBounds.minLon && 
-            arista.origen.lon <= viewportBounds.maxLon;
-            
-        const destinoVisible = 
-            arista.destino.lat >= viewportBounds.minLat && 
-            arista.destino.lat <= viewportBounds.maxLat &&
-            arista.destino.lon >= viewportBounds.minLon && 
-            arista.destino.lon <= viewportBounds.maxLon;
+    try {
+        const [respAristas, respNodos] = await Promise.all([
+            fetch(`${API_URL}/api/aristas?${params}`),
+            fetch(`${API_URL}/api/nodos?${params}`)
+        ]);
+        if (!respAristas.ok || !respNodos.ok) return;
+        const tramos = leerTramos(await respAristas.arrayBuffer());
+        const visibles = leerNodosVisibles(await respNodos.arrayBuffer());
         
-        if (origenVisible || destinoVisible) {
-            aristasVisibles.push(arista);
-        }
-    }
-    
-    // Limitar cantidad según zoom para mejor rendimiento
-    const maxNodos = escala > 2 ? 5000 : escala > 1.5 ? 3000 : 2000;
-    const maxAristas = escala > 2 ? 8000 : escala > 1.5 ? 5000 : 3000;
-    
-    if (nodosVisibles.length > maxNodos) {
-        const step = Math.ceil(nodosVisibles.length / maxNodos);
-        nodosVisibles = nodosVisibles.filter((_, i) => i % step === 0);
-    }
-    
-    if (aristasVisibles.length > maxAristas) {
-        const step = Math.ceil(aristasVisibles.length / maxAristas);
-        aristasVisibles = aristasVisibles.filter((_, i) => i % step === 0);
+        // Mientras tanto se movió la vista: esta respuesta ya no sirve
+        if (consulta !== consultaVista) return;
+        
+        tramosVisibles = tramos;
+        nodosVisibles = visibles;
+        
+        console.log(`📊 Visibles (zoom ${tramos.zoom}): ${nodosVisibles.length} nodos, ${tramos.cantidad} tramos`);
+        dibujar();
+    } catch (error) {
+        console.error('❌ Error al pedir la vista:', error);
     }
-    
-    console.log(`📊 Visibles: ${nodosVisibles.length} nodos, ${aristasVisibles.length} aristas`);
 }
 
 // Buscar nodo más cercano
@@ -229,18 +265,9 @@ async function cargarDatos() {
             document.getElementById('btnCalcular').disabled = false;
         }
         
-        // Cargar aristas
-        const respAristas = await fetch(`${API_URL}/api/aristas`);
-        const dataAristas = await respAristas.json();
-        
-        if (dataAristas.success) {
-            aristasCompletas = dataAristas.aristas;
-            console.log(`✅ ${aristasCompletas.length} aristas cargadas`);
-        }
-        
         document.getElementById('loading').style.display = 'none';
         
-        // Filtrar y dibujar
+        // Pedir las calles visibles y dibujar
         filtrarElementosVisibles();
         dibujar();
         
@@ -255,25 +282,24 @@ function dibujar() {
     ctx.fillStyle = '#1a1a2e';
     ctx.fillRect(0, 0, canvas.width, canvas.height);
     
-    // Dibujar solo aristas visibles
+    // Dibujar solo tramos visibles (ya recortados por el servidor)
     ctx.lineWidth = 1.5 * Math.min(escala, 2); // Limitar grosor
     
-    for (const arista of aristasVisibles) {
-        const p1 = geoToCanvas(arista.origen.lat, arista.origen.lon);
-        const p2 = geoToCanvas(arista.destino.lat, arista.destino.lon);
-        
-        // Culling: no dibujar si está fuera del canvas
-        if ((p1.x < -10 && p2.x < -10) || (p1.x > canvas.width + 10 && p2.x > canvas.width + 10) ||
-            (p1.y < -10 && p2.y < -10) || (p1.y > canvas.height + 10 && p2.y > canvas.height + 10)) {
-            continue;
-        }
-        
-        ctx.strokeStyle = getColorRiesgo(arista.riesgo);
-        ctx.globalAlpha = 0.6;
+    const { offsets, coords, riesgos, lat0, lon0 } = tramosVisibles;
+    ctx.globalAlpha = 0.6;
+    
+    for (let t = 0; t < tramosVisibles.cantidad; t++) {
+        ctx.strokeStyle = getColorRiesgo(riesgos[t]);
         
         ctx.beginPath();
-        ctx.moveTo(p1.x, p1.y);
-        ctx.lineTo(p2.x, p2.y);
+        for (let i = offsets[t]; i < offsets[t + 1]; i++) {
+            const p = geoToCanvas(lat0 + coords[2 * i], lon0 + coords[2 * i + 1]);
+            if (i === offsets[t]) {
+                ctx.moveTo(p.x, p.y);
+            } else {
+                ctx.lineTo(p.x, p.y);
+            }
+        }
         ctx.stroke();
     }
     
@@ -345,7 +371,7 @@ function dibujar() {
     ctx.fillText('JULIACA CENTRO - Dataset Real', 10, 25);
     ctx.font = '12px Arial';
     ctx.fillStyle = '#95e1d3';
-    ctx.fillText(`${nodosVisibles.length}/${Object.keys(nodos).length} nodos | ${aristasVisibles.length}/${aristasCompletas.length} calles | Zoom: ${escala.toFixed(1)}x`, 10, 45);
+    ctx.fillText(`${nodosVisibles.length}/${Object.keys(nodos).length} nodos | ${tramosVisibles.cantidad} tramos | Zoom: ${escala.toFixed(1)}x`, 10, 45);
 }
 
 // Calcular ruta
@@ -90,17 +90,18 @@ class GrafoRutas:
             x1, y1 = self.nodos[origen]['x'], self.nodos[origen]['y']
             x2, y2 = self.nodos[destino]['x'], self.nodos[destino]['y']
             distancia = math.sqrt((x2-x1)**2 + (y2-y1)**2)
-            peso = distancia + (riesgo * 5)
-            self.grafo[origen].append((destino, peso, riesgo))
-            self.grafo[destino].append((origen, peso, riesgo))
+            # Distancia y riesgo por separado: el peso se combina al buscar
+            self.grafo[origen].append((destino, distancia, riesgo))
+            self.grafo[destino].append((origen, distancia, riesgo))
     
-    def dijkstra(self, inicio, fin):
+    def dijkstra(self, inicio, fin, factor_riesgo=5):
         if inicio not in self.nodos or fin not in self.nodos:
             return None, float('inf')
         
-        distancias = {nodo: float('inf') for nodo in self.nodos}
-        distancias[inicio] = 0
-        padres = {nodo: None for nodo in self.nodos}
+        # Solo se guardan los nodos alcanzados: el costo no depende del
+        # tamaño del grafo sino de lo que se explora
+        distancias = {inicio: 0}
+        padres = {inicio: None}
         visitados = set()
         pq = [(0, inicio)]
         
@@ -112,9 +113,9 @@ class GrafoRutas:
             if nodo_actual == fin:
                 break
             
-            for vecino, peso, _ in self.grafo[nodo_actual]:
-                distancia = dist_actual + peso
-                if distancia < distancias[vecino]:
+            for vecino, distancia_arista, riesgo in self.grafo[nodo_actual]:
+                distancia = dist_actual + distancia_arista + (riesgo * factor_riesgo)
+                if distancia < distancias.get(vecino, float('inf')):
                     distancias[vecino] = distancia
                     padres[vecino] = nodo_actual
                     heapq.heappush(pq, (distancia, vecino))
@@ -123,7 +124,7 @@ class GrafoRutas:
         nodo = fin
         while nodo is not None:
             camino.append(nodo)
-            nodo = padres[nodo]
+            nodo = padres.get(nodo)
         camino.reverse()
         
         if not camino or camino[0] != inicio: